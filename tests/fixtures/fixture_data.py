@@ -1,14 +1,26 @@
 import tempfile
 
 import pytest
+from django.core.cache import cache
 from mixer.backend.django import mixer as _mixer
 from posts.models import Post, Group
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Поколения лент сдвигаются после коммита, а тесты откатываются,
+    # поэтому страницы из кеша не должны переходить в следующий тест.
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture()
 def mock_media(settings):
     with tempfile.TemporaryDirectory() as temp_directory:
         settings.MEDIA_ROOT = temp_directory
+        # Миниатюры строятся сразу, а не в потоке после удаления каталога.
+        settings.THUMBNAIL_WORKERS = 0
         yield temp_directory
 
 
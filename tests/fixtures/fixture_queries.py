@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture
+def query_budget(db):
+    """Контекстный менеджер: падает, если блок выполнил больше ``total``
+    запросов или повторил один запрос больше ``duplicates`` раз."""
+    from core.middleware.duplicate_queries import query_budget
+    return query_budget
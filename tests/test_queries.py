@@ -0,0 +1,27 @@
+import pytest
+from django.core.cache import cache
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestQueryBudget:
+
+    @pytest.mark.parametrize('url', [
+        '/',
+        '/group/test-link/',
+        '/profile/TestUser/',
+    ])
+    def test_feeds_do_not_repeat_queries(self, user_client, query_budget,
+                                         few_posts_with_group, url):
+        cache.clear()
+        with query_budget(total=10, duplicates=1):
+            response = user_client.get(url)
+        assert response.status_code == 200
+
+    def test_budget_reports_n_plus_one(self, query_budget,
+                                       few_posts_with_group):
+        from posts.models import Post
+        with pytest.raises(AssertionError, match='test_queries.py'):
+            with query_budget(duplicates=3):
+                for post in Post.objects.all():
+                    post.group.slug
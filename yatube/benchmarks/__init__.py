@@ -0,0 +1,40 @@
+"""Ad-hoc performance benchmarks, run from the ``yatube`` directory.
+
+Every benchmark works on its own throw-away SQLite file, e.g.::
+
+    python -m benchmarks.indexes --posts 1000000
+"""
+import os
+import tempfile
+
+
+def setup_django(database=None):
+    """Configure Django against a scratch database and return its path."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    if database is None:
+        handle, database = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        os.remove(database)
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = database
+    settings.DEBUG = False
+    import django
+    django.setup()
+    return database
+
+
+def percentile(values, fraction):
+    """Linearly interpolated percentile, ``fraction`` from 0 to 1.
+
+    The same as ``statistics.quantiles(method='inclusive')``, which
+    Python 3.7 does not have.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+        position - lower
+    )
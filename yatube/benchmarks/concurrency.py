@@ -0,0 +1,162 @@
+"""Throughput of parallel feed readers and comment/post writers.
+
+    python -m benchmarks.concurrency --readers 8 --writers 4 --seconds 10
+
+The same load runs twice on one scratch database: first as SQLite comes
+out of the box (rollback journal, a connection per request), then with
+``SQLITE_PRAGMAS`` and ``CONN_MAX_AGE`` from the settings.  Every
+operation is wrapped like a request, so connections are closed or
+reused exactly as they would be under a server.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+from benchmarks import percentile, setup_django
+
+# SQLite's own defaults; Python's driver still waits 5 s for locks
+DEFAULTS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+def read(rnd, post_ids):
+    from posts.comments import thread
+    from posts.models import Post
+
+    list(Post.objects.for_feed()[:10])
+    list(thread(rnd.choice(post_ids))[:20])
+
+
+def write(rnd, post_ids, user_ids, count):
+    from posts.models import Comment, Post
+
+    author_id = rnd.choice(user_ids)
+    if count % 10 == 0:
+        Post.objects.create(author_id=author_id, text='Новый пост')
+    else:
+        Comment.objects.create(
+            post_id=rnd.choice(post_ids),
+            author_id=author_id,
+            text='Новый комментарий',
+        )
+
+
+def worker(role, deadline, results, post_ids, user_ids, seed):
+    from django.db import OperationalError, close_old_connections, connection
+
+    rnd = random.Random(seed)
+    timings, errors, count = [], 0, 0
+    while time.perf_counter() < deadline:
+        close_old_connections()
+        start = time.perf_counter()
+        try:
+            if role == 'read':
+                read(rnd, post_ids)
+            else:
+                write(rnd, post_ids, user_ids, count)
+        except OperationalError:
+            errors += 1
+        else:
+            timings.append(time.perf_counter() - start)
+        finally:
+            close_old_connections()
+        count += 1
+    connection.close()
+    results.append((role, timings, errors))
+
+
+def run(name, pragmas, conn_max_age, args, post_ids, user_ids):
+    from django.conf import settings
+    from django.db import connection, connections
+
+    connections.close_all()
+    settings.SQLITE_PRAGMAS = pragmas
+    settings.DATABASES['default']['CONN_MAX_AGE'] = conn_max_age
+    # Switching the journal mode needs the database to itself.
+    connection.ensure_connection()
+    connection.close()
+    results = []
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(role, deadline, results, post_ids, user_ids, index),
+        )
+        for index, role in enumerate(
+            ['read'] * args.readers + ['write'] * args.writers
+        )
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rows = []
+    for role in ('read', 'write'):
+        timings = [t for r, times, _ in results if r == role for t in times]
+        errors = sum(e for r, _, e in results if r == role)
+        rows.append({
+            'config': name,
+            'role': role,
+            'ops': len(timings),
+            'ops_per_s': len(timings) / args.seconds,
+            'p50_ms': percentile(timings, 0.50) * 1000,
+            'p99_ms': percentile(timings, 0.99) * 1000,
+            'errors': errors,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=50000)
+    parser.add_argument('--comments', type=int, default=50000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--json', help='куда записать результаты')
+    args = parser.parse_args()
+
+    database = setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+    from benchmarks.seed import seed
+    from posts import stats
+    from posts.models import Post, User
+
+    tuned = dict(settings.SQLITE_PRAGMAS)
+    conn_max_age = settings.DATABASES['default']['CONN_MAX_AGE']
+    try:
+        settings.SQLITE_PRAGMAS = DEFAULTS
+        call_command('migrate', verbosity=0)
+        seed(users=args.users, posts=args.posts, follows=0,
+             comments=args.comments)
+        stats.reconcile(batch_size=1000)
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        results = run('defaults', DEFAULTS, 0, args, post_ids, user_ids)
+        results += run('tuned', tuned, conn_max_age, args, post_ids,
+                       user_ids)
+    finally:
+        from django.db import connections
+        connections.close_all()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(database + suffix):
+                os.remove(database + suffix)
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({'args': vars(args), 'results': results}, output,
+                      indent=2)
+    print(f'{"config":<9} {"role":<6} {"ops/s":>8} {"p50":>8} {"p99":>9}'
+          f' {"errors":>7}')
+    for row in results:
+        print(f'{row["config"]:<9} {row["role"]:<6}'
+              f' {row["ops_per_s"]:>8.0f} {row["p50_ms"]:>8.2f}'
+              f' {row["p99_ms"]:>9.2f} {row["errors"]:>7}')
+
+
+if __name__ == '__main__':
+    main()
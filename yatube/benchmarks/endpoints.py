@@ -0,0 +1,275 @@
+"""Latency of every posts endpoint through the test client and over WSGI.
+
+    python -m benchmarks.endpoints --posts 100000 --json run.json
+
+Latency percentiles are measured without instrumentation.  Queries and
+peak traced allocations per request come from a separate pass through
+the test client, since tracemalloc slows every request down.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from http.client import HTTPConnection
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from benchmarks import percentile, setup_django
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def endpoints(reader, author, group, post_id):
+    """Return ``{name: (method, path, data)}`` of the measured requests."""
+    from django.urls import reverse
+
+    return {
+        'posts:main': ('GET', reverse('posts:main'), None),
+        'posts:group': ('GET', reverse('posts:group', args=[group]), None),
+        'posts:profile': (
+            'GET', reverse('posts:profile', args=[author]), None),
+        'posts:post_detail': (
+            'GET', reverse('posts:post_detail', args=[post_id]), None),
+        'posts:follow_index': ('GET', reverse('posts:follow_index'), None),
+        'posts:post_create': (
+            'POST', reverse('posts:post_create'), {'text': 'Новый пост'}),
+        'posts:add_comment': (
+            'POST', reverse('posts:add_comment', args=[post_id]),
+            {'text': 'Новый комментарий'}),
+        'posts:profile_follow': (
+            'GET', reverse('posts:profile_follow', args=[author]), None),
+        'posts:profile_unfollow': (
+            'GET', reverse('posts:profile_unfollow', args=[author]), None),
+    }
+
+
+def percentiles(timings):
+    return {
+        'p50': percentile(timings, 0.50) * 1000,
+        'p95': percentile(timings, 0.95) * 1000,
+        'p99': percentile(timings, 0.99) * 1000,
+        'mean': statistics.mean(timings) * 1000,
+        'rps': len(timings) / sum(timings),
+    }
+
+
+class ClientTransport:
+    name = 'client'
+
+    def __init__(self, reader):
+        from django.test import Client
+
+        self.client = Client()
+        self.client.force_login(reader)
+
+    def request(self, method, path, data):
+        if method == 'POST':
+            response = self.client.post(path, data)
+        else:
+            response = self.client.get(path)
+        assert response.status_code < 400, (path, response.status_code)
+
+
+class WSGITransport:
+    """Requests over a socket to ``wsgiref`` serving the project."""
+    name = 'wsgi'
+
+    def __init__(self, session_cookie):
+        from django.core.wsgi import get_wsgi_application
+
+        self.server = make_server(
+            '127.0.0.1', 0, get_wsgi_application(),
+            handler_class=QuietHandler,
+        )
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cookies = {'sessionid': session_cookie}
+        self.request('GET', '/create/', None)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def request(self, method, path, data):
+        headers = {'Cookie': '; '.join(
+            f'{key}={value}' for key, value in self.cookies.items()
+        )}
+        body = None
+        if method == 'POST':
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.cookies['csrftoken']
+        connection = HTTPConnection(*self.server.server_address)
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for key, morsel in SimpleCookie(header).items():
+                self.cookies[key] = morsel.value
+        assert response.status < 400, (path, response.status)
+
+
+def measure_latency(transport, requests, count, cold):
+    from django.core.cache import cache
+
+    results = {}
+    for name, (method, path, data) in requests.items():
+        transport.request(method, path, data)
+        timings = []
+        for _ in range(count):
+            if cold:
+                cache.clear()
+            start = time.perf_counter()
+            transport.request(method, path, data)
+            timings.append(time.perf_counter() - start)
+        results[name] = percentiles(timings)
+    return results
+
+
+def _reset_peak():
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        # Python < 3.9: restarting forgets the peak along with the traces.
+        tracemalloc.stop()
+        tracemalloc.start()
+
+
+def measure_costs(transport, requests, count, cold):
+    """Median queries and peak traced KiB per request."""
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    results = {}
+    tracemalloc.start()
+    try:
+        for name, (method, path, data) in requests.items():
+            queries, peaks = [], []
+            for _ in range(count):
+                if cold:
+                    cache.clear()
+                _reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                with CaptureQueriesContext(connection) as context:
+                    transport.request(method, path, data)
+                queries.append(len(context.captured_queries))
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            results[name] = {
+                'queries': statistics.median(queries),
+                'alloc_kib': statistics.median(peaks) / 1024,
+            }
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--follows', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=100000)
+    parser.add_argument('--images', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='запросов на каждую точку')
+    parser.add_argument('--cost-requests', type=int, default=10)
+    parser.add_argument('--transport', choices=['client', 'wsgi', 'both'],
+                        default='both')
+    parser.add_argument('--cold', action='store_true',
+                        help='очищать кеш перед каждым запросом')
+    parser.add_argument('--json', help='куда записать результаты')
+    args = parser.parse_args()
+
+    database = setup_django()
+    media = tempfile.mkdtemp()
+    from django.conf import settings
+    settings.MEDIA_ROOT = media
+    settings.ALLOWED_HOSTS = ['*']
+    from django.core.management import call_command
+    from benchmarks.seed import seed
+    from posts import stats, timelines
+    from posts.models import Follow, Post, User
+
+    try:
+        call_command('migrate', verbosity=0)
+        seed(users=args.users, groups=args.groups, posts=args.posts,
+             follows=args.follows, comments=args.comments,
+             images=args.images)
+        stats.reconcile(batch_size=1000)
+        timelines.rebuild()
+        follow = Follow.objects.select_related('user').first()
+        reader = follow.user
+        author = User.objects.exclude(
+            pk__in=Follow.objects.filter(
+                user=reader).values('author_id')
+        ).exclude(pk=reader.pk).first()
+        post_id = Post.objects.filter(
+            author=author).values_list('pk', flat=True).first()
+        requests = endpoints(reader, author.username, 'group-1', post_id)
+
+        transports = []
+        client = ClientTransport(reader)
+        if args.transport in ('client', 'both'):
+            transports.append(client)
+        if args.transport in ('wsgi', 'both'):
+            transports.append(
+                WSGITransport(client.client.cookies['sessionid'].value)
+            )
+        results = []
+        costs = measure_costs(client, requests, args.cost_requests,
+                              args.cold)
+        for transport in transports:
+            latency = measure_latency(transport, requests, args.requests,
+                                      args.cold)
+            for name in requests:
+                results.append({
+                    'endpoint': name,
+                    'transport': transport.name,
+                    **latency[name],
+                    **costs[name],
+                })
+            if isinstance(transport, WSGITransport):
+                transport.close()
+    finally:
+        os.remove(database)
+        shutil.rmtree(media, ignore_errors=True)
+
+    report = {
+        'started': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'dataset': {
+            name: getattr(args, name)
+            for name in ('users', 'groups', 'posts', 'follows',
+                         'comments', 'images')
+        },
+        'requests': args.requests,
+        'cold_cache': args.cold,
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(report, output, indent=2)
+    print(f'{"endpoint":<24} {"transport":<9} {"p50":>8} {"p95":>8}'
+          f' {"p99":>8} {"rps":>8} {"queries":>8} {"KiB":>8}')
+    for row in results:
+        print(f'{row["endpoint"]:<24} {row["transport"]:<9}'
+              f' {row["p50"]:>8.2f} {row["p95"]:>8.2f} {row["p99"]:>8.2f}'
+              f' {row["rps"]:>8.0f} {row["queries"]:>8.0f}'
+              f' {row["alloc_kib"]:>8.0f}')
+
+
+if __name__ == '__main__':
+    main()
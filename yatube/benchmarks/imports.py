@@ -0,0 +1,79 @@
+"""Wall time of ``import_content`` on a generated NDJSON file.
+
+    python -m benchmarks.imports --posts 1000000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import setup_django
+
+
+def write_content(path, users, groups, posts, follows, seed=0):
+    rnd = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    with open(path, 'w', encoding='utf-8') as output:
+        def write(row):
+            output.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+        for i in range(1, groups + 1):
+            write({'type': 'group', 'title': f'Группа {i}',
+                   'slug': f'group-{i}', 'description': 'Описание'})
+        for i in range(1, posts + 1):
+            write({
+                'type': 'post',
+                'author': f'user{rnd.randint(1, users)}',
+                'group': (f'group-{rnd.randint(1, groups)}'
+                          if rnd.random() < 0.7 else None),
+                'text': f'Пост {i}',
+                'pub_date': (now - timedelta(seconds=posts - i)).isoformat(),
+            })
+        for _ in range(follows):
+            write({'type': 'follow',
+                   'user': f'user{rnd.randint(1, users)}',
+                   'author': f'user{rnd.randint(1, users)}'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--follows', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int)
+    args = parser.parse_args()
+
+    database = setup_django()
+    from django.core.management import call_command
+    from posts.imports import Importer, read_ndjson
+
+    handle, content = tempfile.mkstemp(suffix='.ndjson')
+    os.close(handle)
+    try:
+        call_command('migrate', verbosity=0)
+        write_content(content, args.users, args.groups,
+                      args.posts, args.follows)
+        importer = Importer(args.batch_size)
+        start = time.perf_counter()
+        with open(content, encoding='utf-8') as lines:
+            importer.load(read_ndjson(lines))
+        loaded = time.perf_counter() - start
+        importer.finish()
+        finished = time.perf_counter() - start
+    finally:
+        os.remove(content)
+        os.remove(database)
+
+    print(f'rows:     {importer.counts}')
+    print(f'load:     {loaded:8.1f} s '
+          f'({args.posts / loaded:,.0f} posts/s)')
+    print(f'rebuild:  {finished - loaded:8.1f} s')
+    print(f'total:    {finished:8.1f} s')
+
+
+if __name__ == '__main__':
+    main()
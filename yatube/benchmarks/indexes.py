@@ -0,0 +1,91 @@
+"""Query plans and timings of the feed lookups before and after 0013.
+
+    python -m benchmarks.indexes --posts 1000000
+"""
+import argparse
+import os
+import statistics
+import time
+
+from benchmarks import setup_django
+
+BEFORE = '0012_authorstats'
+AFTER = '0013_feed_indexes'
+
+
+def lookups():
+    from posts.models import Follow, Post
+    from posts.paginators import keyset_filter
+
+    keys = ('pub_date', 'id')
+    depth = Post.objects.count() * 9 // 10
+    deep = Post.objects.order_by(
+        '-pub_date', '-id'
+    ).values_list('pub_date', 'id')[depth]
+    author_id, group_id = Post.objects.filter(
+        group__isnull=False
+    ).values_list('author_id', 'group_id').first()
+    follow = Follow.objects.values_list('user_id', 'author_id').first()
+    # ``updated`` only appears in 0014, after both measured schemas.
+    feed = Post.objects.for_feed().defer('updated')
+    return {
+        'index, first page': keyset_filter(feed, keys, None, True)[:11],
+        'index, 90% deep': keyset_filter(feed, keys, deep, True)[:11],
+        'profile, first page': keyset_filter(
+            feed.filter(author_id=author_id), keys, None, True)[:11],
+        'group, first page': keyset_filter(
+            feed.filter(group_id=group_id), keys, None, True)[:11],
+        'follow exists': Follow.objects.filter(
+            user_id=follow[0], author_id=follow[1]).values('id')[:1],
+    }
+
+
+def measure(repeat):
+    from django.db import connection
+
+    results = {}
+    with connection.cursor() as cursor:
+        for name, queryset in lookups().items():
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = '; '.join(row[-1] for row in cursor.fetchall())
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                timings.append(time.perf_counter() - start)
+            results[name] = (plan, statistics.median(timings) * 1000)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--follows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    database = setup_django()
+    from django.core.management import call_command
+    from benchmarks.seed import seed
+
+    try:
+        call_command('migrate', 'posts', BEFORE, verbosity=0)
+        seed(users=args.users, posts=args.posts, follows=args.follows)
+        before = measure(args.repeat)
+        call_command('migrate', 'posts', AFTER, verbosity=0)
+        after = measure(args.repeat)
+    finally:
+        os.remove(database)
+
+    for name in before:
+        print(name)
+        for label, (plan, elapsed) in (('before', before[name]),
+                                       ('after', after[name])):
+            print(f'  {label:>6}: {elapsed:9.3f} ms  {plan}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Search latency of FTS5, the token index and ``icontains``.
+
+    python -m benchmarks.search --posts 100000
+"""
+import argparse
+import os
+import statistics
+import time
+
+from benchmarks import setup_django
+
+# Zipf-like vocabulary: low ranks are common words, high ranks are rare.
+VOCABULARY = [f'слово{rank}' for rank in range(1, 5001)]
+WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+QUERIES = {
+    'common term': 'слово1',
+    'rare term': 'слово4000',
+    'two terms': 'слово2 слово30',
+}
+
+
+def text(rnd, i):
+    return ' '.join(rnd.choices(VOCABULARY, WEIGHTS, k=30))
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def icontains(query, filters):
+    """The current admin search: ``LIKE '%term%'`` per term."""
+    from posts.models import Post
+
+    posts = Post.objects.filter(**filters)
+    for term in query.split():
+        posts = posts.filter(text__icontains=term)
+    return list(posts.order_by('-pub_date')[:10])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    database = setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+    from benchmarks.seed import seed
+    from posts import search
+
+    results = {}
+    try:
+        call_command('migrate', verbosity=0)
+        seed(users=args.users, posts=args.posts, follows=0, text=text)
+        group_id = 1
+        for name in ('fts5', 'index'):
+            settings.POSTS_SEARCH_BACKEND = name
+            start = time.perf_counter()
+            search.rebuild()
+            print(f'{name} index built in {time.perf_counter() - start:.1f} s')
+        for label, query in QUERIES.items():
+            for filters in ({}, {'group_id': group_id}):
+                row = f'{label}{", one group" if filters else ""}'
+                results[row] = {
+                    'icontains': timed(
+                        lambda: icontains(query, filters), args.repeat
+                    ),
+                }
+                for name in ('fts5', 'index'):
+                    settings.POSTS_SEARCH_BACKEND = name
+                    results[row][name] = timed(
+                        lambda: search.matches(query, filters, limit=10),
+                        args.repeat,
+                    )
+    finally:
+        os.remove(database)
+
+    print(f'{"query":<28} {"icontains":>10} {"fts5":>10} {"index":>10}')
+    for row, timings in results.items():
+        print(f'{row:<28}' + ''.join(
+            f' {timings[name]:>10.2f}'
+            for name in ('icontains', 'fts5', 'index')
+        ))
+    print('median ms of the first page of 10 results')
+
+
+if __name__ == '__main__':
+    main()
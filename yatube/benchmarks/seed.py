@@ -0,0 +1,96 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+BATCH_SIZE = 10000
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def _insert(table, columns, rows):
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        table, ', '.join(columns), ', '.join(['%s'] * len(columns))
+    )
+    batch = []
+    with connection.cursor() as cursor:
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+
+@transaction.atomic
+def seed(users=1000, groups=50, posts=100000, follows=10000, seed=0,
+         text=None, comments=0, images=0):
+    """Fill an empty, migrated database with raw INSERTs.
+
+    Signals and per-row ORM overhead are skipped on purpose: the dataset
+    only has to look like production, not to go through the write path.
+    ``text(rnd, i)`` returns the text of the i-th post.  ``images`` posts
+    share one small picture saved to the default storage.
+    """
+    rnd = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    _insert(
+        'auth_user',
+        ('password', 'is_superuser', 'username', 'first_name',
+         'last_name', 'email', 'is_staff', 'is_active', 'date_joined'),
+        (('!', False, f'user{i}', 'Имя', 'Фамилия', '', False, True, now)
+         for i in range(1, users + 1)),
+    )
+    _insert(
+        'posts_group',
+        ('title', 'slug', 'description'),
+        ((f'Группа {i}', f'group-{i}', 'Описание')
+         for i in range(1, groups + 1)),
+    )
+    columns = ('text', 'pub_date', 'author_id', 'group_id', 'image')
+    with connection.cursor() as cursor:
+        # Older schemas are seeded too, e.g. by benchmarks.indexes.
+        has_updated = any(
+            column.name == 'updated'
+            for column in connection.introspection.get_table_description(
+                cursor, 'posts_post'
+            )
+        )
+    if has_updated:
+        columns += ('updated',)
+    image, every = '', 0
+    if images:
+        image = default_storage.save('posts/seed.gif', ContentFile(SMALL_GIF))
+        every = max(posts // images, 1)
+    _insert(
+        'posts_post',
+        columns,
+        ((text(rnd, i) if text else f'Пост {i}',
+          now - timedelta(seconds=posts - i),
+          rnd.randint(1, users),
+          rnd.randint(1, groups) if rnd.random() < 0.7 else None,
+          image if every and i % every == 0 else '', now)[:len(columns)]
+         for i in range(1, posts + 1)),
+    )
+    pairs = set()
+    while len(pairs) < min(follows, users * (users - 1)):
+        user_id, author_id = rnd.randint(1, users), rnd.randint(1, users)
+        if user_id != author_id:
+            pairs.add((user_id, author_id))
+    _insert('posts_follow', ('user_id', 'author_id'), sorted(pairs))
+    _insert(
+        'posts_comment',
+        ('text', 'author_id', 'post_id', 'created'),
+        ((f'Комментарий {i}', rnd.randint(1, users), rnd.randint(1, posts),
+          now - timedelta(seconds=comments - i))
+         for i in range(1, comments + 1)),
+    )
@@ -0,0 +1,113 @@
+"""Time to first byte and peak RSS of render() and streamed profiles.
+
+    python -m benchmarks.streaming --sizes 10 100 1000 5000
+
+Every measurement runs in a fresh interpreter, so peak RSS of one path
+is not inflated by the one measured before it.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import setup_django
+
+AUTHOR = 'user1'
+
+
+def request_profile(stream):
+    from django.contrib.auth.models import AnonymousUser
+    from django.core.cache import cache
+    from django.test import RequestFactory
+    from posts.views import profile
+
+    cache.clear()
+    request = RequestFactory().get(
+        f'/profile/{AUTHOR}/', {'stream': ''} if stream else {}
+    )
+    request.user = AnonymousUser()
+    start = time.perf_counter()
+    response = profile(request, username=AUTHOR)
+    if stream:
+        chunks = iter(response.streaming_content)
+        size = len(next(chunks))
+        first_byte = time.perf_counter() - start
+        size += sum(len(chunk) for chunk in chunks)
+    else:
+        first_byte = time.perf_counter() - start
+        size = len(response.content)
+    return first_byte, time.perf_counter() - start, size
+
+
+def worker(args):
+    setup_django(args.database)
+    from django.conf import settings
+    from posts import views
+
+    settings.POSTS_STREAM_PAGE_SIZE = args.size
+    views.NUMBER = args.size
+    stream = args.worker == 'stream'
+    request_profile(stream)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    runs = [request_profile(stream) for _ in range(args.repeat)]
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        'ttfb': statistics.median(run[0] for run in runs) * 1000,
+        'total': statistics.median(run[1] for run in runs) * 1000,
+        'bytes': runs[0][2],
+        'rss': peak / 1024,
+        'rss_delta': (peak - baseline) / 1024,
+    }))
+
+
+def spawn(mode, size, database, repeat):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.streaming', '--worker', mode,
+         '--size', str(size), '--database', database,
+         '--repeat', str(repeat)],
+        check=True, stdout=subprocess.PIPE,
+    ).stdout
+    return json.loads(output.decode().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10, 100, 1000, 5000])
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--worker', choices=['render', 'stream'])
+    parser.add_argument('--size', type=int)
+    parser.add_argument('--database')
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    database = setup_django()
+    from django.core.management import call_command
+    from benchmarks.seed import seed
+
+    try:
+        call_command('migrate', verbosity=0)
+        seed(users=args.users, posts=args.posts, follows=0)
+        print(f'{"posts":>6} {"mode":>7} {"ttfb, ms":>10} {"total, ms":>10}'
+              f' {"KiB":>8} {"peak RSS, MiB":>14} {"growth, MiB":>12}')
+        for size in args.sizes:
+            for mode in ('render', 'stream'):
+                result = spawn(mode, size, database, args.repeat)
+                print(f'{size:>6} {mode:>7} {result["ttfb"]:>10.2f}'
+                      f' {result["total"]:>10.2f}'
+                      f' {result["bytes"] / 1024:>8.0f}'
+                      f' {result["rss"]:>14.1f}'
+                      f' {result["rss_delta"]:>12.1f}')
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# How long a queued task keeps its duplicates out if it never finishes
+QUEUED_TIMEOUT = 60 * 10
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def executor(name, workers):
+    """The thread pool ``name``, started with ``workers`` on first use."""
+    with _lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix=name
+            )
+        return _executors[name]
+
+
+def submit(name, workers, func, *args, queued_key=None):
+    """Run ``func(*args)`` in the pool ``name``, or right away if
+    ``workers`` is 0.
+
+    With ``queued_key`` nothing happens while a task under the same key is
+    still queued; ``func`` deletes the key from the cache once it is done.
+    """
+    if queued_key is not None and not cache.add(
+        queued_key, True, QUEUED_TIMEOUT
+    ):
+        return
+    if workers:
+        executor(name, workers).submit(_run, func, *args)
+    else:
+        func(*args)
+
+
+def _run(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Фоновая задача %s%r не выполнена',
+                         func.__qualname__, args)
+    finally:
+        # Worker threads outlive requests, nothing else closes it.
+        connection.close()
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.replication import replicate
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite на реплики с задержкой, '
+            'чтобы проверить чтение с реплик локально')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=float, default=2,
+                            help='секунд между копированиями')
+        parser.add_argument('--once', action='store_true',
+                            help='скопировать один раз и выйти')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: задайте '
+                               'YATUBE_REPLICA_DB')
+        while True:
+            replicate()
+            self.stdout.write(f'{time.strftime("%X")} реплики обновлены')
+            if options['once']:
+                return
+            time.sleep(options['lag'])
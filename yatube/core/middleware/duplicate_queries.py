@@ -0,0 +1,159 @@
+import logging
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('yatube.queries')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+# Frames of the detector itself never explain where a query comes from.
+_OWN_DIR = os.path.dirname(os.path.abspath(__file__))
+STACK_DEPTH = 5
+
+
+def fingerprint(sql):
+    """Normalize literals and ``IN`` lists so that repeats look the same."""
+    sql = _SPACE.sub(' ', sql).strip()
+    sql = _STRING.sub('?', sql.replace('%s', '?'))
+    sql = _NUMBER.sub('?', sql)
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def _project_root():
+    # The repository root also holds the pytest suite in tests/.
+    return os.path.dirname(settings.BASE_DIR)
+
+
+def _is_project_file(filename):
+    filename = os.path.abspath(filename)
+    return (
+        filename.startswith(_project_root())
+        and not filename.startswith(_OWN_DIR)
+        and 'site-packages' not in filename
+    )
+
+
+def origin():
+    """Return ``(template line, project stack)`` of the running query.
+
+    The template line is the innermost template node being rendered,
+    the stack lists the innermost project frames.
+    """
+    template, stack = None, []
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if template is None and code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            if token is not None:
+                template = f'{node.origin.name}:{token.lineno}'
+        elif len(stack) < STACK_DEPTH and _is_project_file(code.co_filename):
+            path = os.path.relpath(code.co_filename, _project_root())
+            stack.append(f'{path}:{frame.f_lineno} in {code.co_name}')
+        frame = frame.f_back
+    return template, tuple(stack)
+
+
+class QueryRecorder:
+    """Count queries per fingerprint while active, with their origins."""
+
+    def __init__(self, using='default'):
+        self.connection = connections[using]
+        self.total = 0
+        self.counts = Counter()
+        self.origins = defaultdict(Counter)
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        key = fingerprint(sql)
+        self.total += 1
+        self.counts[key] += 1
+        self.origins[key][origin()] += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    def duplicates(self, threshold):
+        """``[(fingerprint, count, origin)]`` run more than ``threshold``
+        times, the most frequent origin of each.
+        """
+        found = [
+            (key, count, self.origins[key].most_common(1)[0][0])
+            for key, count in self.counts.items()
+            if count > threshold
+        ]
+        return sorted(found, key=lambda item: item[1], reverse=True)
+
+    def report(self, threshold):
+        lines = []
+        for key, count, (template, stack) in self.duplicates(threshold):
+            lines.append(f'{count} x {key}')
+            if template:
+                lines.append(f'    шаблон: {template}')
+            lines.extend(f'    {frame}' for frame in stack)
+        return '\n'.join(lines)
+
+
+@contextmanager
+def query_budget(total=None, duplicates=None, using='default'):
+    """Fail with ``AssertionError`` if the block runs more than ``total``
+    queries or any query more than ``duplicates`` times.
+    """
+    if duplicates is None:
+        duplicates = settings.DUPLICATE_QUERY_THRESHOLD
+    with QueryRecorder(using) as recorder:
+        yield recorder
+    problems = []
+    if total is not None and recorder.total > total:
+        problems.append(f'{recorder.total} запросов при бюджете {total}')
+    if recorder.duplicates(duplicates):
+        problems.append(
+            f'Повторяются больше {duplicates} раз:\n'
+            + recorder.report(duplicates)
+        )
+    if problems:
+        raise AssertionError('\n'.join(problems))
+
+
+class DuplicateQueryMiddleware:
+    """Report views repeating a query more than the threshold (N+1).
+
+    Meant for development and staging, see ``DUPLICATE_QUERY_CHECK``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DUPLICATE_QUERY_CHECK:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        threshold = settings.DUPLICATE_QUERY_THRESHOLD
+        duplicates = recorder.duplicates(threshold)
+        if duplicates:
+            match = request.resolver_match
+            logger.warning(
+                '%s %s повторяет запросы:\n%s',
+                match.view_name if match else request.path,
+                request.method,
+                recorder.report(threshold),
+            )
+            response['X-Duplicate-Queries'] = str(len(duplicates))
+        return response
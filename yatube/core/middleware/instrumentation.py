@@ -0,0 +1,196 @@
+import heapq
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import Template
+
+logger = logging.getLogger('yatube.requests')
+
+_local = threading.local()
+_buffer = deque(maxlen=settings.INSTRUMENTATION_BUFFER_SIZE)
+_installed = False
+_counted_backends = set()
+
+
+def _current():
+    """The record of the sampled request on this thread, if any."""
+    return getattr(_local, 'record', None)
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(*args, **kwargs):
+        record = _current()
+        if record is None or record['_rendering']:
+            return render(*args, **kwargs)
+        record['_rendering'] = True
+        start = time.perf_counter()
+        try:
+            return render(*args, **kwargs)
+        finally:
+            record['template_ms'] += (time.perf_counter() - start) * 1000
+            record['_rendering'] = False
+    return wrapper
+
+
+def _counted(method, many):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        record = _current()
+        if record is None or record['_caching']:
+            return method(self, *args, **kwargs)
+        record['_caching'] = True
+        try:
+            if many:
+                keys = list(args[0])
+                found = method(self, keys, *args[1:], **kwargs)
+                hits = len(found)
+                misses = len(keys) - hits
+            else:
+                found = method(self, *args, **kwargs)
+                default = args[1] if len(args) > 1 else kwargs.get('default')
+                # A cached None looks like a miss, as it does to callers.
+                hits = int(found is not default)
+                misses = 1 - hits
+        finally:
+            record['_caching'] = False
+        record['cache_hits'] += hits
+        record['cache_misses'] += misses
+        return found
+    return wrapper
+
+
+def install():
+    """Wrap template rendering once per process.
+
+    The wrappers only do work on threads serving a sampled request.
+    """
+    global _installed
+    if not _installed:
+        _installed = True
+        Template.render = _timed_render(Template.render)
+
+
+def _count_cache(backend):
+    # The default cache may be swapped, e.g. by override_settings.
+    if backend not in _counted_backends:
+        _counted_backends.add(backend)
+        backend.get = _counted(backend.get, many=False)
+        backend.get_many = _counted(backend.get_many, many=True)
+
+
+def _execute(execute, sql, params, many, context):
+    record = _current()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        record['queries'] += 1
+        record['sql_ms'] += elapsed
+        slowest = record['_slowest']
+        entry = (elapsed, sql)
+        if len(slowest) < settings.INSTRUMENTATION_SLOW_QUERIES:
+            heapq.heappush(slowest, entry)
+        elif entry > slowest[0]:
+            heapq.heapreplace(slowest, entry)
+
+
+class InstrumentationMiddleware:
+    """Measure a sample of requests into a ring buffer and a log.
+
+    Only ``INSTRUMENTATION_SAMPLE_RATE`` of requests pay for the
+    measurements, the others only draw a random number.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        if random.random() >= settings.INSTRUMENTATION_SAMPLE_RATE:
+            return self.get_response(request)
+        _count_cache(type(caches['default']))
+        record = _local.record = {
+            'queries': 0,
+            'sql_ms': 0.0,
+            'template_ms': 0.0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            '_slowest': [],
+            '_rendering': False,
+            '_caching': False,
+        }
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                # Replicas too: feeds read from them.
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_execute))
+                response = self.get_response(request)
+        finally:
+            _local.record = None
+        match = request.resolver_match
+        record.update(
+            view=match.view_name if match else None,
+            method=request.method,
+            path=request.path,
+            status=response.status_code,
+            duration_ms=(time.perf_counter() - start) * 1000,
+            slow_queries=[
+                {'ms': elapsed, 'sql': sql}
+                for elapsed, sql in sorted(record['_slowest'], reverse=True)
+            ],
+            time=time.time(),
+        )
+        for key in ('_slowest', '_rendering', '_caching'):
+            del record[key]
+        _buffer.append(record)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, ensure_ascii=False))
+        return response
+
+
+def recent():
+    return list(_buffer)
+
+
+def clear():
+    _buffer.clear()
+
+
+def summary():
+    """Aggregate the ring buffer per view, slowest views first."""
+    views = {}
+    for record in recent():
+        views.setdefault(record['view'] or record['path'], []).append(record)
+    rows = []
+    for view, records in views.items():
+        durations = [record['duration_ms'] for record in records]
+        slowest = max(records, key=lambda record: record['duration_ms'])
+        rows.append({
+            'view': view,
+            'requests': len(records),
+            'p50_ms': statistics.median(durations),
+            'max_ms': max(durations),
+            **{
+                f'avg_{field}': statistics.mean(
+                    record[field] for record in records
+                )
+                for field in ('queries', 'sql_ms', 'template_ms',
+                              'cache_hits', 'cache_misses')
+            },
+            'slow_queries': slowest['slow_queries'],
+        })
+    rows.sort(key=lambda row: row['p50_ms'], reverse=True)
+    return rows
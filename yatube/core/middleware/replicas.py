@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.routers import PIN_COOKIE, take_written
+
+
+class PrimaryPinMiddleware:
+    """Pin a client that has just written to the primary for a while.
+
+    ``REPLICA_MAX_LAG`` seconds after any write its requests read from
+    the primary, so the client sees its own post, comment or follow.
+    Sits above the session middleware, logging in counts as a write.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        take_written()
+        response = self.get_response(request)
+        if take_written():
+            lag = settings.REPLICA_MAX_LAG
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + lag),
+                max_age=lag,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
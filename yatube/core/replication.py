@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.db import connections
+
+
+def replicate(aliases=None):
+    """Copy the primary SQLite database onto its replicas.
+
+    A stand-in for real replication: run it every few seconds and the
+    replicas lag behind by that much.
+    """
+    source = connections['default']
+    source.ensure_connection()
+    for alias in aliases or settings.DATABASE_REPLICAS:
+        target = connections[alias]
+        target.ensure_connection()
+        source.connection.backup(target.connection)
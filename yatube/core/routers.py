@@ -0,0 +1,99 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+# Until when, as a Unix timestamp, the client reads from the primary
+PIN_COOKIE = 'primary_until'
+# DatabaseCache entries: the generation counters have to be current,
+# and storing a page is not something the client has written.
+CACHE_APP_LABEL = 'django_cache'
+
+_local = threading.local()
+
+
+def pinned(request):
+    """Whether ``request`` has to see what its client has just written."""
+    if request.method not in ('GET', 'HEAD'):
+        return True
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def reading_from_replica():
+    return getattr(_local, 'replica', None) is not None
+
+
+@contextmanager
+def _reading_from(alias):
+    previous = getattr(_local, 'replica', None)
+    _local.replica = alias
+    try:
+        yield
+    finally:
+        _local.replica = previous
+
+
+def replica_reads():
+    """Send reads inside the block to one of ``DATABASE_REPLICAS``."""
+    return _reading_from(random.choice(settings.DATABASE_REPLICAS))
+
+
+def primary_reads():
+    """Read from the primary inside the block, even in a replica view."""
+    return _reading_from(None)
+
+
+def read_from_replica(view):
+    """Let ``view`` read from a replica unless its client is pinned."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.DATABASE_REPLICAS or pinned(request):
+            return view(request, *args, **kwargs)
+        # The session and the user come from the primary: a session
+        # created a moment ago may not have been replicated yet.
+        request.user.is_authenticated
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def mark_written():
+    _local.written = True
+
+
+def take_written():
+    """Whether the thread has written since the last call."""
+    written = getattr(_local, 'written', False)
+    _local.written = False
+    return written
+
+
+class ReplicaRouter:
+    """Writes go to the primary, reads to a replica in replica views.
+
+    Replicas are copies of the primary, so nothing is migrated on them.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return 'default'
+        return getattr(_local, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != CACHE_APP_LABEL:
+            mark_written()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
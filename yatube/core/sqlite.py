@@ -0,0 +1,13 @@
+from django.conf import settings
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Tune every new SQLite connection with ``SQLITE_PRAGMAS``.
+
+    Runs on the raw connection, so the pragmas never show up among the
+    queries of a request.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
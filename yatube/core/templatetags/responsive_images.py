@@ -0,0 +1,17 @@
+from django import template
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/picture.html')
+def picture(image, sizes=None, **attrs):
+    """``<picture>`` choosing a format and a width for the viewport.
+
+    ``image`` holds ``src`` and optionally ``srcset``, ``width``,
+    ``height`` and ``sources``, a list of ``type`` and ``srcset`` pairs.
+    Extra keyword arguments become attributes of the ``<img>``.
+    """
+    width = image.get('width')
+    if sizes is None and width:
+        sizes = f'(max-width: {width}px) 100vw, {width}px'
+    return {'image': image, 'sizes': sizes, 'attrs': attrs}
@@ -0,0 +1,13 @@
+from django.urls import path
+from . import views
+
+
+app_name = 'core'
+
+urlpatterns = [
+    path(
+        'instrumentation/',
+        views.instrumentation_summary,
+        name='instrumentation'
+    ),
+]
@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from .middleware import instrumentation
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', status=404)
@@ -11,3 +16,12 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+@staff_member_required
+def instrumentation_summary(request):
+    return JsonResponse({
+        'sample_rate': settings.INSTRUMENTATION_SAMPLE_RATE,
+        'requests': len(instrumentation.recent()),
+        'views': instrumentation.summary(),
+    })
@@ -0,0 +1,271 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.urls import resolve
+from django.utils import timezone
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date, quote_etag
+
+from core.routers import primary_reads, reading_from_replica
+
+from . import purging
+from .models import Post
+
+POST_CARD_FRAGMENT = 'post_card'
+
+# How a post card looks in each feed, see posts/includes/post_card.html.
+# ``thumbnail`` is a name from posts.thumbnails.GEOMETRIES.
+POST_CARD_VARIANTS = {
+    'index': {'show_author': True, 'show_group': True,
+              'thumbnail': 'wide'},
+    'group': {'show_author': True, 'show_group': False,
+              'thumbnail': 'wide'},
+    'profile': {'show_author': False, 'show_group': True,
+                'thumbnail': 'narrow'},
+}
+
+
+def post_card_key(post, variant):
+    return make_template_fragment_key(
+        POST_CARD_FRAGMENT, [post.pk, post.updated, variant]
+    )
+
+
+def forget_post_cards(post):
+    cache.delete_many(
+        [post_card_key(post, variant) for variant in POST_CARD_VARIANTS]
+    )
+
+
+def touch_group_posts(group):
+    """Move every card and feed showing the group's posts to a new version."""
+    posts = Post.objects.filter(group=group)
+    authors = posts.values_list('author__username', flat=True).distinct()
+    bump(
+        'posts',
+        f'group:{group.slug}',
+        *(f'author:{username}' for username in authors),
+    )
+    posts.update(updated=timezone.now())
+
+
+def _generation_key(scope):
+    return f'generation:{scope}'
+
+
+def _fresh_generation():
+    # Never restart from 1: pages cached under an evicted generation
+    # must not become valid again.
+    return int(time.time() * 1000)
+
+
+def _modified_key(scope):
+    return f'modified:{scope}'
+
+
+def _cached_or_added(keys, default):
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, default(), timeout=None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def generations(scopes):
+    return _cached_or_added(
+        [_generation_key(scope) for scope in scopes], _fresh_generation
+    )
+
+
+def last_modified(scopes):
+    """When any of ``scopes`` was last bumped, as a Unix timestamp.
+
+    A scope nobody has bumped since the cache was emptied counts as
+    modified now, which only costs clients one full download.
+    """
+    return max(_cached_or_added(
+        [_modified_key(scope) for scope in scopes], time.time
+    ))
+
+
+def bump(*scopes):
+    """Invalidate every feed cached under one of ``scopes``.
+
+    Waits for the transaction: a request in between would otherwise
+    cache the old data under the new generation.
+    """
+    scopes = set(scopes)
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    now = time.time()
+    for scope in scopes:
+        try:
+            cache.incr(_generation_key(scope))
+        except ValueError:
+            cache.add(_generation_key(scope), _fresh_generation(), None)
+        cache.set(_modified_key(scope), now, None)
+
+
+def _viewer_scopes(request, scopes):
+    """``(viewer, scopes)`` with the viewer's own scope for logged in users.
+
+    Pages differ per user, e.g. in the header, so each user gets a private
+    copy that also changes with what they follow.
+    """
+    if request.user.is_authenticated:
+        return request.user.pk, [*scopes, f'user:{request.user.pk}']
+    return 'anonymous', list(scopes)
+
+
+def _validators(request, viewer, scopes, *timestamps):
+    """``(version, last_modified)`` of a page built from ``scopes``.
+
+    ``version`` changes with the path, the viewer, every generation and
+    the extra ``timestamps``; it names the cached copy and is the ETag.
+    """
+    versions = '.'.join(map(str, [*generations(scopes), *timestamps]))
+    version = hashlib.md5(
+        f'{request.get_full_path()}:{viewer}:{versions}'.encode()
+    ).hexdigest()
+    return version, int(max([last_modified(scopes), *timestamps]))
+
+
+def _not_modified(request, version, modified):
+    return get_conditional_response(
+        request, etag=quote_etag(version), last_modified=modified
+    )
+
+
+def _finish(request, response, viewer, version, modified):
+    if response.status_code == 200:
+        response.setdefault('ETag', quote_etag(version))
+        response.setdefault('Last-Modified', http_date(modified))
+    patch_vary_headers(response, ('Cookie',))
+    if viewer != 'anonymous':
+        patch_cache_control(response, private=True)
+    return response
+
+
+def _render_fresh(modified, view, request, *args, **kwargs):
+    # A replica may not have the change yet, and what is rendered now
+    # is cached and tagged as the latest version.
+    if (reading_from_replica()
+            and time.time() - modified < settings.REPLICA_MAX_LAG):
+        with primary_reads():
+            return view(request, *args, **kwargs)
+    return view(request, *args, **kwargs)
+
+
+def cache_feed(scope):
+    """Cache a feed view until a generation in ``scope`` is bumped.
+
+    ``scope`` is formatted with the view kwargs, e.g. ``'group:{slug}'``.
+    Authenticated users get private copies that also depend on their own
+    generation, anonymous users share one public copy.  The generations
+    also make the ETag, so revalidation is answered from the cache alone.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            viewer, scopes = _viewer_scopes(
+                request, [scope.format(**kwargs)]
+            )
+            version, modified = _validators(request, viewer, scopes)
+            response = _not_modified(request, version, modified)
+            if response is None:
+                key = f'feed:{version}'
+                response = cache.get(key)
+                if response is None:
+                    response = _render_fresh(
+                        modified, view, request, *args, **kwargs
+                    )
+                    if (response.status_code == 200
+                            and not response.streaming):
+                        cache.set(key, response, settings.FEED_CACHE_TTL)
+            return _finish(request, response, viewer, version, modified)
+        return wrapper
+    return decorator
+
+
+def conditional(describe):
+    """Answer ``If-None-Match``/``If-Modified-Since`` without the view.
+
+    ``describe`` gets the view arguments and returns the scopes and the
+    modification timestamp the page depends on, or ``None`` to leave the
+    request to the view, e.g. for a 404.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            state = None
+            if request.method in ('GET', 'HEAD'):
+                state = describe(*args, **kwargs)
+            if state is None:
+                return view(request, *args, **kwargs)
+            scopes, timestamp = state
+            viewer, scopes = _viewer_scopes(request, scopes)
+            if viewer != 'anonymous':
+                # Their page holds a CSRF token, which a new login rotates.
+                get_token(request)
+                viewer = f'{viewer}:{request.META["CSRF_COOKIE"]}'
+            version, modified = _validators(
+                request, viewer, scopes, timestamp
+            )
+            response = (_not_modified(request, version, modified)
+                        or view(request, *args, **kwargs))
+            return _finish(request, response, viewer, version, modified)
+        return wrapper
+    return decorator
+
+
+def bump_post_feeds(post, *old_group_slugs):
+    """Invalidate the feeds showing ``post``, here and in the proxy."""
+    slugs = [slug for slug in old_group_slugs if slug]
+    if post.group_id is not None:
+        slugs.append(post.group.slug)
+    bump(
+        'posts',
+        f'author:{post.author.username}',
+        *(f'group:{slug}' for slug in slugs),
+    )
+    purging.purge(
+        'posts',
+        purging.author_key(post.author_id),
+        purging.post_key(post.pk),
+        *(purging.group_key(slug) for slug in slugs),
+    )
+
+
+def warm_up(paths):
+    """Render anonymous copies of ``paths`` into the shared cache.
+
+    Goes through the same ``cache_feed`` keys as real requests, so it
+    behaves identically on every cache backend.
+    """
+    warmed = 0
+    for path in paths:
+        match = resolve(path)
+        request = HttpRequest()
+        request.method = 'GET'
+        request.path = request.path_info = path
+        request.META['SERVER_NAME'] = 'localhost'
+        request.META['SERVER_PORT'] = '80'
+        request.user = AnonymousUser()
+        response = match.func(request, *match.args, **match.kwargs)
+        warmed += response.status_code == 200
+    return warmed
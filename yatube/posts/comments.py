@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import bump, generations
+from .models import Comment
+from .paginators import CursorPaginator
+
+
+class CommentPaginator(CursorPaginator):
+    """Oldest comments first, addressed by ``(created, id)`` cursors."""
+    key_fields = ('created', 'id')
+    ascending = True
+
+
+def scope(post_id):
+    return f'comments:{post_id}'
+
+
+def thread(post_id):
+    return Comment.objects.filter(
+        post_id=post_id
+    ).select_related('author').only(
+        'id', 'text', 'created', 'post_id', 'author__username'
+    ).order_by('created', 'id')
+
+
+def comment_page(post_id, per_page, cursor=None):
+    """Return ``(comments, next_cursor)`` for one batch of the thread.
+
+    The first batch is what every reader of the post sees, so it is cached
+    until ``forget_first_page`` moves the post to a new generation.
+    """
+    key = None
+    if not cursor:
+        generation, = generations([scope(post_id)])
+        key = f'{scope(post_id)}:{per_page}:{generation}'
+        batch = cache.get(key)
+        if batch is not None:
+            return batch
+    paginator = CommentPaginator(thread(post_id), per_page)
+    page = paginator.get_cursor_page(cursor)
+    batch = list(page), paginator.next_cursor
+    if key is not None:
+        cache.set(key, batch, settings.FEED_CACHE_TTL)
+    return batch
+
+
+def forget_first_page(post_id):
+    bump(scope(post_id))
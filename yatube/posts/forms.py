@@ -1,5 +1,7 @@
 from django import forms
-from .models import Post, Comment, Follow
+from django.core.files.uploadedfile import UploadedFile
+from .images import ingest
+from .models import Post, Comment, Follow, Group, User
 
 
 class PostForm(forms.ModelForm):
@@ -16,6 +18,15 @@ class PostForm(forms.ModelForm):
             'image': 'Загружаем фото в пост',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            try:
+                return ingest(image)
+            except ValueError as error:
+                raise forms.ValidationError(str(error))
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -31,3 +42,24 @@ class FollowForm(forms.ModelForm):
             'author': 'Автор поста',
         }
         fields = ('user',)
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Запрос', max_length=200)
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        to_field_name='slug',
+        required=False,
+        label='Группа',
+        empty_label='Все группы',
+    )
+    author = forms.CharField(label='Автор', required=False)
+
+    def clean_author(self):
+        username = self.cleaned_data['author']
+        if not username:
+            return None
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise forms.ValidationError('Такого пользователя нет')
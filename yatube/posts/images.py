@@ -0,0 +1,118 @@
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image, ImageOps
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'AVIF': 'avif'}
+MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp', 'AVIF': 'image/avif'}
+# Variants are small, modern formats hold up at a lower quality
+VARIANT_QUALITY = {'JPEG': 80, 'WEBP': 75, 'AVIF': 55}
+BROKEN_IMAGE = 'Изображение повреждено, загрузите другой файл'
+
+
+def _flatten(image):
+    """Drop transparency onto white, JPEG has no alpha channel."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def normalize(upload):
+    """Re-encode an uploaded picture into a spooled temporary file.
+
+    JPEGs are decoded straight at a reduced scale, so a large phone photo
+    never sits in memory at full resolution; other pictures with more
+    than ``POST_IMAGE_MAX_PIXELS`` are refused before decoding.  EXIF
+    orientation is applied and all metadata is dropped.  Raises
+    ``ValueError`` for pictures that cannot be read.
+    """
+    size = settings.POST_IMAGE_MAX_SIZE
+    image_format = settings.POST_IMAGE_FORMAT
+    upload.seek(0)
+    try:
+        source = Image.open(upload)
+    except (OSError, Image.DecompressionBombError) as error:
+        raise ValueError(BROKEN_IMAGE) from error
+    with source:
+        source.draft('RGB', (size, size))
+        width, height = source.size
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise ValueError(f'Слишком большое изображение: {width}×{height}')
+        output = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        try:
+            image = ImageOps.exif_transpose(source)
+            image.thumbnail((size, size))
+            if image_format == 'JPEG':
+                image = _flatten(image)
+            image.save(
+                output,
+                image_format,
+                quality=settings.POST_IMAGE_QUALITY,
+                optimize=True,
+            )
+        except (OSError, ValueError) as error:
+            # Headers can be fine while the data is cut short.
+            output.close()
+            raise ValueError(BROKEN_IMAGE) from error
+    output.seek(0)
+    return output
+
+
+def ingest(upload):
+    """Normalize ``upload`` into a ``File`` ready to be stored.
+
+    ``Post.image`` storage names it after its content, so the name here
+    only carries the extension.
+    """
+    extension = EXTENSIONS[settings.POST_IMAGE_FORMAT]
+    return File(normalize(upload), name=f'image.{extension}')
+
+
+def can_encode(image_format):
+    """Whether this Pillow build writes ``image_format``."""
+    try:
+        Image.new('RGB', (1, 1)).save(BytesIO(), image_format)
+    except (KeyError, OSError):
+        return False
+    return True
+
+
+def variants(file, sizes, widths, formats):
+    """Yield ``(name, width, format, data)`` for every variant of ``file``.
+
+    ``sizes`` maps names to the ``(width, height)`` to crop to, each is
+    also scaled down to the smaller ``widths``.  The source is decoded
+    once, at the smallest JPEG scale that still covers every size.
+    """
+    largest = (
+        max(width for width, _ in sizes.values()),
+        max(height for _, height in sizes.values()),
+    )
+    with Image.open(file) as source:
+        source.draft('RGB', largest)
+        image = _flatten(ImageOps.exif_transpose(source))
+    for name, (width, height) in sizes.items():
+        scaled = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        steps = sorted({w for w in widths if w < width} | {width},
+                       reverse=True)
+        for step in steps:
+            if step != scaled.width:
+                scaled = scaled.resize(
+                    (step, round(height * step / width)), Image.LANCZOS
+                )
+            for image_format in formats:
+                output = BytesIO()
+                scaled.save(
+                    output,
+                    image_format,
+                    quality=VARIANT_QUALITY[image_format],
+                    optimize=True,
+                )
+                yield name, step, image_format, output.getvalue()
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import media
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки, на которые не ссылается ни один пост, '
+            'вместе с их миниатюрами')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int,
+                            help='не трогать файлы моложе стольких секунд')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='только перечислить файлы')
+
+    def handle(self, *args, **options):
+        media.reconcile(options['dry_run'], stdout=self.stdout)
+        deleted = media.collect(
+            options['grace'], options['dry_run'], stdout=self.stdout
+        )
+        verb = 'К удалению' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(f'{verb} файлов: {len(deleted)}'))
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exports import export_ndjson
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты и комментарии автора в формате NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--output', help='Файл для выгрузки, по умолчанию stdout'
+        )
+        parser.add_argument(
+            '--inline-images', action='store_true',
+            help='Вложить картинки постов в base64',
+        )
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        chunks = export_ndjson(
+            author,
+            inline_images=options['inline_images'],
+            chunk_size=options['chunk_size'],
+        )
+        if options['output'] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            output.writelines(chunks)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Готовит миниатюры всех размеров и форматов для постов, '
+            'загруженных до фоновой очереди')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').values_list('pk', flat=True)
+        done = 0
+        for post_id in posts.iterator():
+            thumbnails.generate(post_id)
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {done}'))
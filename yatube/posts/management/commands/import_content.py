@@ -0,0 +1,47 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts.imports import TYPES, Importer, read_csv, read_ndjson
+
+
+class Command(BaseCommand):
+    help = ('Загружает группы, посты, комментарии и подписки из NDJSON '
+            'или CSV без сигналов, затем пересчитывает производные данные')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+')
+        parser.add_argument(
+            '--format', choices=['ndjson', 'csv'],
+            help='По умолчанию определяется по расширению файла',
+        )
+        parser.add_argument(
+            '--type', choices=TYPES,
+            help='Тип строк CSV-файла без колонки type',
+        )
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        importer = Importer(options['batch_size'])
+        for path in options['paths']:
+            file_format = options['format']
+            if file_format is None:
+                extension = os.path.splitext(path)[1].lower()
+                file_format = 'csv' if extension == '.csv' else 'ndjson'
+            with open(path, encoding='utf-8', newline='') as lines:
+                if file_format == 'csv':
+                    rows = read_csv(lines, options['type'])
+                else:
+                    rows = read_ndjson(lines)
+                try:
+                    importer.load(rows)
+                except (KeyError, ValueError, IntegrityError) as error:
+                    raise CommandError(f'{path}: {error}')
+            self.stdout.write(f'{path} загружен')
+        counts = importer.finish(stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            'Загружено: ' + ', '.join(
+                f'{row_type} {count}' for row_type, count in counts.items()
+            )
+        ))
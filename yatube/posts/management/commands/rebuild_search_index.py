@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Заново индексирует тексты всех постов для поиска'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        search.rebuild(options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс перестроен: {search.backend()}'
+        ))
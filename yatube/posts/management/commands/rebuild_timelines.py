@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import timelines
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок из Follow и Post'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TIMELINE_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        timelines.rebuild(options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Ленты подписок пересобраны'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, подписок и комментариев авторов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fixed = stats.reconcile(options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Исправлено записей: {fixed}'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from posts.caching import warm_up
+from posts.models import Group
+
+
+class Command(BaseCommand):
+    help = 'Заполняет кэш первыми страницами главной и групп'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groups', type=int, default=50)
+
+    def handle(self, *args, **options):
+        paths = [reverse('posts:main')]
+        slugs = Group.objects.values_list('slug', flat=True)
+        paths.extend(
+            reverse('posts:group', kwargs={'slug': slug})
+            for slug in slugs[:options['groups']]
+        )
+        warmed = warm_up(paths)
+        self.stdout.write(self.style.SUCCESS(f'Прогрето страниц: {warmed}'))
@@ -0,0 +1,113 @@
+import os
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import thumbnails
+from .models import MediaFile, Post
+
+
+def _storage():
+    return Post._meta.get_field('image').storage
+
+
+def retain(name):
+    """Count one more post referring to the stored file ``name``."""
+    if not name:
+        return
+    if MediaFile.objects.filter(name=name).update(
+        references=F('references') + 1, changed=timezone.now()
+    ):
+        return
+    try:
+        with transaction.atomic():
+            MediaFile.objects.create(name=name, references=1)
+    except IntegrityError:
+        # Another post has just stored the same content.
+        retain(name)
+
+
+def release(name):
+    """Count one post less; unreferenced files wait for ``collect``."""
+    if name:
+        MediaFile.objects.filter(name=name, references__gt=0).update(
+            references=F('references') - 1, changed=timezone.now()
+        )
+
+
+def reconcile(dry_run=False, stdout=None):
+    """Recount references from posts, fixing rows that drifted.
+
+    Returns the number of rows that had to be created or updated;
+    ``dry_run`` only counts them.
+    """
+    totals = dict(
+        Post.objects.exclude(image='').values('image').annotate(
+            total=Count('pk')
+        ).values_list('image', 'total').order_by()
+    )
+    stored = dict(MediaFile.objects.values_list('name', 'references'))
+    now = timezone.now()
+    created = [
+        MediaFile(name=name, references=total)
+        for name, total in totals.items() if name not in stored
+    ]
+    updated = [
+        MediaFile(name=name, references=totals.get(name, 0), changed=now)
+        for name, references in stored.items()
+        if totals.get(name, 0) != references
+    ]
+    if not dry_run:
+        MediaFile.objects.bulk_create(created)
+        MediaFile.objects.bulk_update(updated, ['references', 'changed'])
+    fixed = len(created) + len(updated)
+    if stdout is not None:
+        verb = 'к исправлению' if dry_run else 'исправлено'
+        stdout.write(f'Счётчики ссылок на файлы: {verb} {fixed}')
+    return fixed
+
+
+def _stored_files(directory):
+    storage = _storage()
+    root = storage.path(directory)
+    for path, _, files in os.walk(root):
+        for filename in files:
+            full_path = os.path.join(path, filename)
+            name = os.path.relpath(full_path, storage.location)
+            yield name.replace(os.sep, '/'), os.path.getmtime(full_path)
+
+
+def collect(grace=None, dry_run=False, stdout=None):
+    """Delete stored images no post refers to, with their thumbnails.
+
+    Files touched within ``grace`` seconds are kept: an upload may be
+    about to refer to them.  Returns the deleted names.
+    """
+    if grace is None:
+        grace = settings.MEDIA_GC_GRACE
+    storage = _storage()
+    cutoff = time.time() - grace
+    directory = Post._meta.get_field('image').upload_to
+    counted = set(
+        MediaFile.objects.filter(references__gt=0).values_list(
+            'name', flat=True
+        )
+    )
+    deleted = []
+    for name, modified in _stored_files(directory):
+        if name in counted or modified > cutoff:
+            continue
+        if Post.objects.filter(image=name).exists():
+            # A drifted counter, ``reconcile`` will fix it.
+            continue
+        if not dry_run:
+            MediaFile.objects.filter(name=name, references=0).delete()
+            thumbnails.forget(name, storage)
+            storage.delete(name)
+        deleted.append(name)
+        if stdout is not None:
+            stdout.write(name)
+    return deleted
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:03
+
+from django.db import migrations, models
+import posts.storage
+
+
+def count_references(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    MediaFile = apps.get_model('posts', 'MediaFile')
+    totals = Post.objects.exclude(image='').values('image').annotate(
+        total=models.Count('pk')
+    ).values_list('image', 'total').order_by()
+    MediaFile.objects.bulk_create(
+        MediaFile(name=name, references=total) for name, total in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('references', models.PositiveIntegerField(default=0)),
+                ('changed', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.AddIndex(
+            model_name='mediafile',
+            index=models.Index(fields=['references', 'changed'], name='media_unreferenced_idx'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
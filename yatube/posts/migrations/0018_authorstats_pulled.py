@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_pulled(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    AuthorStats.objects.filter(
+        follower_count__gte=settings.TIMELINE_CELEBRITY_THRESHOLD
+    ).update(pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_media_files'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='pulled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_pulled, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import ContentAddressedStorage
+
 
 User = get_user_model()
 
@@ -14,9 +16,28 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    FEED_FIELDS = (
+        'id',
+        'text',
+        'pub_date',
+        'updated',
+        'image',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group__slug',
+    )
+
+    def for_feed(self):
+        """Posts ready to be rendered as feed cards in a single query."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -32,11 +53,28 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -58,6 +96,14 @@ class Comment(models.Model):
     )
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.text
 
@@ -73,3 +119,80 @@ class Follow(models.Model):
         related_name='following',
         on_delete=models.CASCADE,
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date', '-post_id']
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        related_name='stats',
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # Followers pull the author's posts instead of getting them pushed,
+    # see posts/timelines.py.
+    pulled = models.BooleanField(default=False)
+
+
+class SearchPosting(models.Model):
+    """How often ``term`` occurs in ``post``, see posts/search.py."""
+    term = models.CharField(max_length=100)
+    post = models.ForeignKey(
+        Post,
+        related_name='search_postings',
+        on_delete=models.CASCADE,
+    )
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('term', 'post')
+
+
+class MediaFile(models.Model):
+    """How many posts refer to a stored file, see posts/media.py."""
+    name = models.CharField(max_length=100, primary_key=True)
+    references = models.PositiveIntegerField(default=0)
+    changed = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['references', 'changed'],
+                name='media_unreferenced_idx',
+            ),
+        ]
@@ -0,0 +1,136 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def keyset_filter(queryset, key_fields, boundary, forward):
+    """Order ``queryset`` by ``key_fields`` and skip up to ``boundary``.
+
+    ``forward`` walks towards older objects (descending keys).
+    """
+    first, second = key_fields
+    if boundary is not None:
+        value, tiebreak = boundary
+        lookup = 'lt' if forward else 'gt'
+        # The inclusive bound lets the database use a range scan on
+        # the index, the OR clause only resolves ties on ``first``.
+        queryset = queryset.filter(
+            **{f'{first}__{lookup}e': value}
+        ).filter(
+            Q(**{f'{first}__{lookup}': value})
+            | Q(**{first: value, f'{second}__{lookup}': tiebreak})
+        )
+    prefix = '-' if forward else ''
+    return queryset.order_by(prefix + first, prefix + second)
+
+
+def keyset_slice(queryset, key_fields, boundary, forward, limit):
+    """Return up to ``limit`` objects strictly past ``boundary``."""
+    return list(
+        keyset_filter(queryset, key_fields, boundary, forward)[:limit]
+    )
+
+
+class CursorPaginator(Paginator):
+    """Keyset paginator over a ``(first, second)`` pair of ordering keys.
+
+    Pages are addressed by opaque cursor tokens instead of numbers, so no
+    OFFSET and no ``COUNT(*)`` is ever issued.  ``get_page`` keeps working
+    for the legacy ``?page=N`` links.
+    """
+    key_fields = ('pub_date', 'id')
+    # Pages walk towards smaller keys, newest first, unless set.
+    ascending = False
+
+    def __init__(self, object_list, per_page, key_fields=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if key_fields is not None:
+            self.key_fields = tuple(key_fields)
+        self.keyset = False
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def _field(self, name):
+        return self.object_list.model._meta.get_field(name)
+
+    def _key(self, obj):
+        return [
+            self._field(name).value_to_string(obj)
+            for name in self.key_fields
+        ]
+
+    def _to_python(self, name, value):
+        return self._field(name).to_python(value)
+
+    def encode_cursor(self, direction, obj):
+        payload = json.dumps([direction] + self._key(obj))
+        return urlsafe_base64_encode(payload.encode())
+
+    def decode_cursor(self, cursor):
+        """Return ``(direction, boundary)``, or ``(NEXT, None)`` if invalid."""
+        if not cursor:
+            return NEXT, None
+        try:
+            direction, *values = json.loads(urlsafe_base64_decode(cursor))
+            boundary = tuple(
+                self._to_python(name, value)
+                for name, value in zip(self.key_fields, values)
+            )
+        except (TypeError, ValueError, ValidationError):
+            return NEXT, None
+        if direction not in (NEXT, PREVIOUS) or len(boundary) != 2:
+            return NEXT, None
+        if None in boundary:
+            return NEXT, None
+        return direction, boundary
+
+    def fetch(self, boundary, forward, limit):
+        return keyset_slice(
+            self.object_list, self.key_fields, boundary,
+            forward != self.ascending, limit
+        )
+
+    def get_cursor_page(self, cursor):
+        direction, boundary = self.decode_cursor(cursor)
+        forward = direction == NEXT
+        object_list = self.fetch(boundary, forward, self.per_page + 1)
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if forward:
+            has_previous = boundary is not None
+            has_next = has_more
+        else:
+            object_list.reverse()
+            has_previous = has_more
+            has_next = True
+        if object_list and has_next:
+            self.next_cursor = self.encode_cursor(NEXT, object_list[-1])
+        if object_list and has_previous:
+            self.previous_cursor = self.encode_cursor(
+                PREVIOUS, object_list[0]
+            )
+        self.keyset = True
+        # Page only knows about numbers: expose a window of at most three
+        # pages so that has_next/has_previous work without counting rows.
+        number = 2 if self.previous_cursor else 1
+        self.num_pages = number + 1 if self.next_cursor else number
+        return self._get_page(object_list, number, self)
+
+
+def paginate(request, object_list, per_page,
+             paginator_class=CursorPaginator, **kwargs):
+    paginator = paginator_class(object_list, per_page, **kwargs)
+    cursor = request.GET.get('cursor')
+    page_number = request.GET.get('page')
+    if cursor is None and (
+        page_number is not None or settings.POSTS_PAGE_NUMBER_LINKS
+    ):
+        return paginator.get_page(page_number)
+    return paginator.get_cursor_page(cursor)
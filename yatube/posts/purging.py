@@ -0,0 +1,135 @@
+import logging
+import threading
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import Signal, receiver
+from django.utils.cache import patch_cache_control
+
+from core import background
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Surrogate-Key'
+
+# Sent with ``keys`` once the change behind them is committed.
+purge_requested = Signal()
+
+_lock = threading.Lock()
+# Keys waiting for the background thread
+_pending = set()
+
+
+def post_key(post_id):
+    return f'post-{post_id}'
+
+
+def group_key(slug):
+    return f'group-{slug}'
+
+
+def author_key(user_id):
+    return f'author-{user_id}'
+
+
+def page_keys(posts):
+    """Keys of every post and group shown on a feed page."""
+    keys = []
+    for post in posts:
+        keys.append(post_key(post.pk))
+        if post.group_id is not None:
+            keys.append(group_key(post.group.slug))
+    return keys
+
+
+def tag(request, response, *keys):
+    """Let a reverse proxy keep an anonymous ``response`` until one of
+    ``keys`` is purged, or ``PROXY_CACHE_MAX_AGE`` runs out.
+    """
+    if request.user.is_authenticated:
+        return response
+    response[HEADER] = ' '.join(dict.fromkeys(keys))
+    patch_cache_control(
+        response, public=True, max_age=settings.PROXY_CACHE_MAX_AGE
+    )
+    return response
+
+
+def purge(*keys):
+    """Ask the proxy to drop pages tagged with any of ``keys``.
+
+    Waits for the transaction, so the proxy cannot fetch the old page
+    again before the change is visible.
+    """
+    keys = sorted(set(keys))
+    if keys:
+        transaction.on_commit(
+            lambda: purge_requested.send(sender=None, keys=keys)
+        )
+
+
+@receiver(purge_requested)
+def send_to_proxy(sender, keys, **kwargs):
+    """``PURGE`` ``PROXY_PURGE_URL`` with the keys in ``Surrogate-Key``,
+    as Varnish with xkey and Fastly understand it.
+
+    Sent from a background thread unless ``PROXY_PURGE_IN_BACKGROUND``
+    is off; keys arriving while a purge is on its way go out together
+    in the next one.
+    """
+    if not settings.PROXY_PURGE_URL:
+        return
+    if not settings.PROXY_PURGE_IN_BACKGROUND:
+        _send(keys)
+        return
+    with _lock:
+        idle = not _pending
+        _pending.update(keys)
+    if idle:
+        # One thread keeps the purges in order.
+        background.submit('purging', 1, _send_pending)
+
+
+def _send_pending():
+    with _lock:
+        keys = sorted(_pending)
+        _pending.clear()
+    _send(keys)
+
+
+def _send(keys):
+    request = Request(
+        settings.PROXY_PURGE_URL,
+        method='PURGE',
+        headers={HEADER: ' '.join(keys)},
+    )
+    try:
+        with urlopen(request, timeout=settings.PROXY_PURGE_TIMEOUT):
+            pass
+    except OSError:
+        # The pages expire after PROXY_CACHE_MAX_AGE anyway.
+        logger.warning('Прокси не принял сброс ключей %s', keys,
+                       exc_info=True)
+
+
+class LocalPurgeReceiver:
+    """Stand-in for the proxy in tests and development.
+
+    Remembers the purged keys while used as a context manager.
+    """
+
+    def __init__(self):
+        self.keys = set()
+        self.purges = []
+
+    def __call__(self, sender, keys, **kwargs):
+        self.purges.append(keys)
+        self.keys.update(keys)
+
+    def __enter__(self):
+        purge_requested.connect(self, weak=False)
+        return self
+
+    def __exit__(self, *exc_info):
+        purge_requested.disconnect(self)
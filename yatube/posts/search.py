@@ -0,0 +1,227 @@
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, FloatField, Func, Q, Sum, Value, When
+)
+
+from .models import Post, SearchPosting
+from .paginators import CursorPaginator
+
+# Created by migration 0016 when SQLite has FTS5, rowid is the post id.
+FTS_TABLE = 'posts_post_fts'
+TERM_RE = re.compile(r'\w+')
+TERM_LENGTH = SearchPosting._meta.get_field('term').max_length
+# Scores are compared again when a cursor is decoded, rounding keeps
+# them stable between queries.
+SCORE_DIGITS = 9
+# Term weights barely move with a few new posts, the total may be stale.
+TOTAL_KEY = 'search-post-total'
+TOTAL_TIMEOUT = 60 * 10
+
+
+def tokenize(text):
+    return [term[:TERM_LENGTH] for term in TERM_RE.findall(text.casefold())]
+
+
+@lru_cache(maxsize=None)
+def has_fts_table():
+    """Whether migration 0016 created the FTS5 table, asked once."""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def backend():
+    """``'fts5'`` when the FTS5 table exists, ``'index'`` otherwise.
+
+    ``settings.POSTS_SEARCH_BACKEND`` forces one of them.
+    """
+    if settings.POSTS_SEARCH_BACKEND:
+        return settings.POSTS_SEARCH_BACKEND
+    return 'fts5' if has_fts_table() else 'index'
+
+
+def _postings(post_id, text):
+    return [
+        SearchPosting(term=term, post_id=post_id, frequency=frequency)
+        for term, frequency in Counter(tokenize(text)).items()
+    ]
+
+
+def index_post(post):
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text],
+            )
+        return
+    SearchPosting.objects.filter(post_id=post.pk).delete()
+    SearchPosting.objects.bulk_create(_postings(post.pk, post.text))
+
+
+def unindex_post(post_id):
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+    # Postings go away with the post itself.
+
+
+def rebuild(batch_size=None, stdout=None):
+    """Index every post again, e.g. after a bulk import."""
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM posts_post'
+            )
+        return
+    SearchPosting.objects.all().delete()
+    posts = Post.objects.values_list('id', 'text').iterator(
+        chunk_size=batch_size
+    )
+    indexed = 0
+    while True:
+        batch = list(islice(posts, batch_size))
+        if not batch:
+            return
+        SearchPosting.objects.bulk_create(
+            posting
+            for post_id, text in batch
+            for posting in _postings(post_id, text)
+        )
+        indexed += len(batch)
+        if stdout is not None:
+            stdout.write(f'{indexed} постов проиндексировано')
+
+
+def _fts5_matches(terms, filters, boundary, forward, limit):
+    where, params = [], [' '.join(f'"{term}"' for term in terms)]
+    for column, value in filters.items():
+        where.append(f'p.{column} = %s')
+        params.append(value)
+    if boundary is not None:
+        lookup = '<' if forward else '>'
+        where.append(
+            f'(r.score {lookup} %s OR (r.score = %s AND r.id {lookup} %s))'
+        )
+        score, post_id = boundary
+        params.extend([score, score, post_id])
+    order = 'DESC' if forward else 'ASC'
+    sql = (
+        f'SELECT r.id, r.score FROM ('
+        f'SELECT rowid AS id, ROUND(-bm25({FTS_TABLE}), {SCORE_DIGITS}) '
+        f'AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        f') AS r JOIN posts_post p ON p.id = r.id'
+        f'{" WHERE " if where else ""}{" AND ".join(where)}'
+        f' ORDER BY r.score {order}, r.id {order} LIMIT %s'
+    )
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _index_matches(terms, filters, boundary, forward, limit):
+    documents = dict(
+        SearchPosting.objects.filter(
+            term__in=terms
+        ).values('term').annotate(
+            documents=Count('id')
+        ).values_list('term', 'documents').order_by()
+    )
+    if len(documents) < len(terms):
+        return []
+    total = cache.get_or_set(TOTAL_KEY, Post.objects.count, TOTAL_TIMEOUT)
+    weight = Case(
+        *(When(term=term, then=Value(math.log(1 + total / count)))
+          for term, count in documents.items()),
+        output_field=FloatField(),
+    )
+    rows = SearchPosting.objects.filter(
+        term__in=terms,
+        **{f'post__{column}': value for column, value in filters.items()}
+    ).values('post_id').annotate(
+        score=Func(
+            Sum(ExpressionWrapper(
+                F('frequency') * weight, output_field=FloatField()
+            )),
+            SCORE_DIGITS,
+            function='ROUND',
+            output_field=FloatField(),
+        ),
+        matched=Count('term'),
+    ).filter(matched=len(terms))
+    if boundary is not None:
+        lookup = 'lt' if forward else 'gt'
+        score, post_id = boundary
+        rows = rows.filter(
+            Q(**{f'score__{lookup}': score})
+            | Q(score=score, **{f'post_id__{lookup}': post_id})
+        )
+    prefix = '-' if forward else ''
+    return list(
+        rows.order_by(
+            prefix + 'score', prefix + 'post_id'
+        ).values_list('post_id', 'score')[:limit]
+    )
+
+
+def matches(query, filters=None, boundary=None, forward=True, limit=10):
+    """Return ``[(post_id, score)]`` of posts having every term of ``query``.
+
+    Higher scores rank first; ``filters`` are ``posts_post`` columns,
+    e.g. ``{'group_id': 1}``; ``boundary`` is a ``(score, id)`` pair.
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return []
+    find = _fts5_matches if backend() == 'fts5' else _index_matches
+    return find(terms, filters or {}, boundary, forward, limit)
+
+
+class SearchPaginator(CursorPaginator):
+    """Cursor pages of search results ranked by ``(score, id)``."""
+    key_fields = ('score', 'id')
+
+    def __init__(self, query, per_page, filters=None, **kwargs):
+        super().__init__(Post.objects.none(), per_page, **kwargs)
+        self.query = query
+        self.filters = filters or {}
+
+    def _key(self, post):
+        return [post.search_score, post.pk]
+
+    def _to_python(self, name, value):
+        return float(value) if name == 'score' else int(value)
+
+    def fetch(self, boundary, forward, limit):
+        rows = matches(self.query, self.filters, boundary, forward, limit)
+        posts = Post.objects.for_feed().in_bulk(
+            [post_id for post_id, _ in rows]
+        )
+        found = []
+        for post_id, score in rows:
+            if post_id in posts:
+                posts[post_id].search_score = score
+                found.append(posts[post_id])
+        return found
@@ -0,0 +1,174 @@
+import threading
+
+from django.db.models import Count
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import (
+    caching, comments, media, purging, search, stats, timelines
+)
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+# How many comments of each post being deleted are still to go,
+# see post_deleting.
+_local = threading.local()
+
+
+def _cascading_comments():
+    if not hasattr(_local, 'comments'):
+        _local.comments = {}
+    return _local.comments
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw=False, **kwargs):
+    if not instance._state.adding and not raw:
+        # The post may be moving out of a group whose feed is cached
+        # and may be dropping its reference to an image.
+        instance._old_group_slug, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group__slug', 'image').first() or (None, '')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.change(instance.author_id, 'post_count', 1)
+        timelines.push_post(instance)
+    old_image = getattr(instance, '_old_image', '')
+    if (instance.image.name or '') != old_image:
+        media.retain(instance.image.name)
+        media.release(old_image)
+    search.index_post(instance)
+    caching.bump_post_feeds(
+        instance, getattr(instance, '_old_group_slug', None)
+    )
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # Settle the cascaded comments per commenter here, with one query,
+    # instead of in comment_deleted once per comment.
+    commenters = Comment.objects.filter(post_id=instance.pk).values(
+        'author_id', 'author__username'
+    ).annotate(total=Count('pk')).order_by()
+    commenters = list(commenters)
+    if not commenters:
+        return
+    _cascading_comments()[instance.pk] = sum(
+        commenter['total'] for commenter in commenters
+    )
+    stats.subtract('comment_count', {
+        commenter['author_id']: commenter['total']
+        for commenter in commenters
+    })
+    caching.bump(*(
+        f'author:{commenter["author__username"]}'
+        for commenter in commenters
+    ))
+    purging.purge(*(
+        purging.author_key(commenter['author_id'])
+        for commenter in commenters
+    ))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    stats.change(instance.author_id, 'post_count', -1)
+    caching.forget_post_cards(instance)
+    media.release(instance.image.name)
+    caching.bump_post_feeds(instance)
+    search.unindex_post(instance.pk)
+
+
+@receiver(pre_save, sender=Group)
+def group_changing(sender, instance, raw=False, **kwargs):
+    if not instance._state.adding and not raw:
+        # Proxied pages link to the group by its old slug.
+        instance._old_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        caching.touch_group_posts(instance)
+        slugs = {instance.slug, getattr(instance, '_old_slug', None)}
+        purging.purge(*(purging.group_key(slug) for slug in slugs if slug))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    caching.touch_group_posts(instance)
+    purging.purge(purging.group_key(instance.slug))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.change(instance.author_id, 'comment_count', 1)
+        caching.bump(f'author:{instance.author.username}')
+        comments.forget_first_page(instance.post_id)
+        _purge_comment_pages(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    cascading = _cascading_comments()
+    if instance.post_id in cascading:
+        cascading[instance.post_id] -= 1
+        if not cascading[instance.post_id]:
+            del cascading[instance.post_id]
+        return
+    stats.change(instance.author_id, 'comment_count', -1)
+    caching.bump(f'author:{instance.author.username}')
+    comments.forget_first_page(instance.post_id)
+    _purge_comment_pages(instance)
+
+
+def _purge_comment_pages(comment):
+    # The commenter's profile shows how many comments they wrote.
+    purging.purge(
+        purging.post_key(comment.post_id),
+        purging.author_key(comment.author_id),
+    )
+
+
+def _bump_follow_feeds(follow):
+    caching.bump(
+        f'user:{follow.user_id}',
+        f'author:{follow.user.username}',
+        f'author:{follow.author.username}',
+    )
+    purging.purge(
+        purging.author_key(follow.user_id),
+        purging.author_key(follow.author_id),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.change(instance.author_id, 'follower_count', 1)
+        stats.change(instance.user_id, 'following_count', 1)
+        timelines.follow(instance.user_id, instance.author_id)
+        _bump_follow_feeds(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.change(instance.author_id, 'follower_count', -1)
+    stats.change(instance.user_id, 'following_count', -1)
+    timelines.unfollow(instance.user_id, instance.author_id)
+    _bump_follow_feeds(instance)
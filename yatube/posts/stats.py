@@ -0,0 +1,100 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, When
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+COUNTERS = {
+    'post_count': (Post, 'author_id'),
+    'follower_count': (Follow, 'author_id'),
+    'following_count': (Follow, 'user_id'),
+    'comment_count': (Comment, 'author_id'),
+}
+
+
+def change(user_id, field, delta):
+    """Shift one counter in place; missing rows are recounted on read."""
+    queryset = AuthorStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def subtract(field, deltas):
+    """Take ``deltas[user_id]`` off each user's counter in one UPDATE."""
+    if not deltas:
+        return
+    AuthorStats.objects.filter(user_id__in=deltas).update(**{
+        field: Case(
+            *(
+                When(user_id=user_id, **{f'{field}__gte': delta},
+                     then=F(field) - delta)
+                for user_id, delta in deltas.items()
+            ),
+            default=F(field),
+        ),
+    })
+
+
+def count(user_ids):
+    """Count every statistic for ``user_ids`` with one query per counter."""
+    stats = {
+        user_id: AuthorStats(user_id=user_id) for user_id in user_ids
+    }
+    for field, (model, lookup) in COUNTERS.items():
+        totals = model.objects.filter(
+            **{f'{lookup}__in': user_ids}
+        ).values(lookup).annotate(
+            total=Count('pk')
+        ).values_list(lookup, 'total').order_by()
+        for user_id, total in totals:
+            setattr(stats[user_id], field, total)
+    return stats
+
+
+def stats_for(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        stats = count([user.pk])[user.pk]
+        try:
+            with transaction.atomic():
+                stats.save(force_insert=True)
+        except IntegrityError:
+            # Another request has just recounted the same user.
+            stats = AuthorStats.objects.get(user_id=user.pk)
+        user.stats = stats
+        return stats
+
+
+def reconcile(batch_size, stdout=None):
+    """Recount every user's statistics, fixing rows that drifted.
+
+    Returns the number of rows that had to be created or updated.
+    """
+    fixed = 0
+    user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+    last_id = 0
+    while True:
+        batch = list(user_ids.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            return fixed
+        last_id = batch[-1]
+        fresh = count(batch)
+        stored = AuthorStats.objects.in_bulk(batch)
+        created = [
+            stats for user_id, stats in fresh.items()
+            if user_id not in stored
+        ]
+        updated = [
+            stats for user_id, stats in fresh.items()
+            if user_id in stored and any(
+                getattr(stats, field) != getattr(stored[user_id], field)
+                for field in COUNTERS
+            )
+        ]
+        AuthorStats.objects.bulk_create(created)
+        AuthorStats.objects.bulk_update(updated, list(COUNTERS))
+        fixed += len(created) + len(updated)
+        if stdout is not None:
+            stdout.write(f'Пользователи до id={last_id}: '
+                         f'исправлено {len(created) + len(updated)}')
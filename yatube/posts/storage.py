@@ -0,0 +1,56 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 64 * 1024
+# posts/ab/cd/abcd….jpg keeps every directory small
+SHARDS = 2
+SHARD_WIDTH = 2
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in iter(lambda: content.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def sharded_name(directory, digest, extension):
+    shards = [
+        digest[index * SHARD_WIDTH:(index + 1) * SHARD_WIDTH]
+        for index in range(SHARDS)
+    ]
+    return '/'.join([directory, *shards, digest + extension])
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Store every file once, under the hash of its content.
+
+    The directory from ``upload_to`` and the extension are kept, the rest
+    of the name is replaced.  Saving content that is already stored writes
+    nothing and returns the existing name.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Equal names mean equal content, there is nothing to avoid.
+        return name
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        name = sharded_name(directory, content_hash(content), extension)
+        if self.exists(name):
+            # Fresh again for the grace period of posts.media.collect.
+            os.utime(self.path(name))
+            return name
+        # Written aside and renamed, so a concurrent upload of the same
+        # content can never be seen half written.
+        partial = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+        os.replace(self.path(partial), self.path(name))
+        return name
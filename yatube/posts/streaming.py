@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+from .paginators import NEXT, CursorPaginator, keyset_filter
+from .templatetags.post_cards import post_card
+
+# Stands in for the list of posts while the page around it is rendered.
+SLOT = mark_safe('<!-- posts -->')
+
+
+def wants_stream(request):
+    return 'stream' in request.GET
+
+
+def stream_feed(request, template_name, context, posts, variant):
+    """Send the page around a feed at once and its post cards as they load.
+
+    Posts are read with ``iterator()`` from the ``?cursor=`` position, so
+    the time to the first byte does not depend on
+    ``settings.POSTS_STREAM_PAGE_SIZE``.
+    """
+    per_page = settings.POSTS_STREAM_PAGE_SIZE
+    paginator = CursorPaginator(posts, per_page)
+    direction, boundary = paginator.decode_cursor(request.GET.get('cursor'))
+    if direction != NEXT:
+        boundary = None
+    queryset = keyset_filter(posts, paginator.key_fields, boundary, True)
+    page = render_to_string(
+        template_name, {**context, 'stream_slot': SLOT}, request
+    )
+    head, tail = page.split(SLOT, 1)
+    card = get_template('posts/includes/post_card.html')
+    more = get_template('posts/includes/stream_more.html')
+
+    def chunks():
+        yield head
+        last = None
+        for number, post in enumerate(
+            queryset[:per_page + 1].iterator(
+                chunk_size=settings.POSTS_STREAM_CHUNK_SIZE
+            )
+        ):
+            if number == per_page:
+                cursor = paginator.encode_cursor(NEXT, last)
+                yield more.render({'cursor': cursor}, request)
+                break
+            if last is not None:
+                yield '<hr>'
+            yield card.render(post_card(post, variant), request)
+            last = post
+        yield tail
+
+    return StreamingHttpResponse(chunks())
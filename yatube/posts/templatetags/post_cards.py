@@ -0,0 +1,23 @@
+from django import template
+from django.conf import settings
+
+from .. import thumbnails
+from ..caching import POST_CARD_VARIANTS
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_card.html')
+def post_card(post, variant='index'):
+    return {
+        'post': post,
+        'variant': variant,
+        'ttl': settings.POST_CARD_CACHE_TTL,
+        **POST_CARD_VARIANTS[variant],
+    }
+
+
+@register.simple_tag
+def post_image(post, name):
+    """Thumbnails of ``post`` for ``{% picture %}`` from responsive_images."""
+    return thumbnails.variants(post, name)
@@ -0,0 +1,30 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from core import background
+
+
+class BackgroundTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_without_workers_runs_right_away(self):
+        task = mock.Mock()
+        background.submit('tests', 0, task, 1)
+        task.assert_called_once_with(1)
+
+    def test_queued_key_keeps_duplicates_out(self):
+        task = mock.Mock()
+        background.submit('tests', 0, task, queued_key='tests-queued')
+        background.submit('tests', 0, task, queued_key='tests-queued')
+        self.assertEqual(task.call_count, 1)
+        cache.delete('tests-queued')
+        background.submit('tests', 0, task, queued_key='tests-queued')
+        self.assertEqual(task.call_count, 2)
+
+    def test_failure_in_worker_is_logged(self):
+        task = mock.Mock(side_effect=ValueError, __qualname__='task')
+        with self.assertLogs('core.background', 'ERROR'):
+            background.submit('tests', 1, task)
+            background.executor('tests', 1).submit(lambda: None).result(5)
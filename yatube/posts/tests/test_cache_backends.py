@@ -0,0 +1,137 @@
+import multiprocessing
+import shutil
+import tempfile
+
+import fakeredis
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from ..caching import bump, generations, warm_up
+from ..models import Post, User
+from .utils import run_on_commit
+
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+LOCMEM_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+SHARED_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEMP_CACHE_DIR,
+    },
+}
+DATABASE_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'test_yatube_cache',
+    },
+}
+FAKE_REDIS_CACHE = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+        'OPTIONS': {
+            'CONNECTION_POOL_KWARGS': {
+                'connection_class': fakeredis.FakeConnection,
+                'server': fakeredis.FakeServer(),
+            },
+        },
+    },
+}
+
+
+def _bump_in_worker(scope):
+    bump(scope)
+
+
+def _read_in_worker(scope, queue):
+    queue.put(generations([scope])[0])
+
+
+class CacheBackendTests:
+    """Feed caching on top of one of settings.CACHE_BACKENDS."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Текст')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_moves_generation(self):
+        before = generations(['posts'])[0]
+        with run_on_commit():
+            bump('posts')
+        self.assertEqual(generations(['posts'])[0], before + 1)
+
+    def test_bump_of_unknown_scope_starts_generation(self):
+        with run_on_commit():
+            bump('group:new')
+        self.assertIsNotNone(cache.get('generation:group:new'))
+
+    def test_warm_up_fills_feed_cache(self):
+        self.assertEqual(warm_up([reverse('posts:main')]), 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:main'))
+        # The database cache reads its own table, the feed is not rebuilt.
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('posts_', tables)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LocMemCacheTests(CacheBackendTests, TestCase):
+    pass
+
+
+@override_settings(CACHES=SHARED_CACHE)
+class FileBasedCacheTests(CacheBackendTests, TestCase):
+    pass
+
+
+@override_settings(CACHES=SHARED_CACHE)
+class SharedCacheTests(SimpleTestCase):
+    """Workers see each other's bumps; locmem and the fake are per process."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def run_worker(self, target, *args):
+        worker = multiprocessing.get_context('fork').Process(
+            target=target, args=args
+        )
+        worker.start()
+        worker.join(timeout=30)
+        self.assertEqual(worker.exitcode, 0)
+
+    def test_invalidation_is_seen_by_other_workers(self):
+        before = generations(['posts'])[0]
+        self.run_worker(_bump_in_worker, 'posts')
+        queue = multiprocessing.get_context('fork').Queue()
+        self.run_worker(_read_in_worker, 'posts', queue)
+        self.assertEqual(queue.get(timeout=30), before + 1)
+        self.assertEqual(generations(['posts'])[0], before + 1)
+
+
+@override_settings(CACHES=DATABASE_CACHE)
+class DatabaseCacheTests(CacheBackendTests, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('createcachetable', verbosity=0)
+
+
+@override_settings(CACHES=FAKE_REDIS_CACHE)
+class RedisCacheTests(CacheBackendTests, TestCase):
+    pass
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from ..caching import generations, post_card_key
+from ..models import Group, Post, User
+from .utils import run_on_commit
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            description='Описание',
+            slug='test-slug'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Старый текст',
+            group=self.group
+        )
+        self.url = reverse('posts:profile', kwargs={'username': self.user})
+
+    def test_card_is_cached(self):
+        self.guest_client.get(self.url)
+        self.assertIsNotNone(cache.get(post_card_key(self.post, 'profile')))
+
+    def test_edit_shows_up_immediately(self):
+        self.guest_client.get(self.url)
+        self.post.text = 'Новый текст'
+        with run_on_commit():
+            self.post.save()
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, 'Новый текст')
+
+    def test_group_change_invalidates_cards(self):
+        self.guest_client.get(self.url)
+        self.group.slug = 'new-slug'
+        with run_on_commit():
+            self.group.save()
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, '/group/new-slug/')
+
+    def test_generations_move_after_commit(self):
+        before = generations(['posts'])
+        # Still inside the transaction of the test.
+        Post.objects.create(author=self.user, text='Ещё не виден')
+        self.assertEqual(generations(['posts']), before)
+        with run_on_commit():
+            Post.objects.create(author=self.user, text='Виден')
+        self.assertNotEqual(generations(['posts']), before)
+
+    def test_delete_drops_cards(self):
+        self.guest_client.get(self.url)
+        key = post_card_key(self.post, 'profile')
+        self.post.delete()
+        self.assertIsNone(cache.get(key))
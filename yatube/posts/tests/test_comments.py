@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from ..comments import comment_page
+from ..models import Comment, Post, User
+from ..views import COMMENTS_NUMBER
+from .utils import run_on_commit
+
+
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(COMMENTS_NUMBER + 5)
+        )
+        cls.oldest_first = list(Comment.objects.order_by('created', 'id'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_post_detail_shows_first_batch(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertEqual(
+            response.context['comments'],
+            self.oldest_first[:COMMENTS_NUMBER]
+        )
+        self.assertIsNotNone(response.context['next_cursor'])
+
+    def test_fragment_returns_next_batch(self):
+        _, next_cursor = comment_page(self.post.pk, COMMENTS_NUMBER)
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk]),
+            {'cursor': next_cursor},
+        )
+        batch = response.json()
+        self.assertIsNone(batch['next'])
+        for comment in self.oldest_first[COMMENTS_NUMBER:]:
+            self.assertIn(comment.text, batch['html'])
+        self.assertNotIn(self.oldest_first[0].text, batch['html'])
+
+    def test_fragment_of_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=[0])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_first_batch_is_cached(self):
+        comment_page(self.post.pk, COMMENTS_NUMBER)
+        with self.assertNumQueries(0):
+            comment_page(self.post.pk, COMMENTS_NUMBER)
+
+    def test_add_comment_invalidates_first_batch(self):
+        post = Post.objects.create(author=self.user, text='Без комментариев')
+        comment_page(post.pk, COMMENTS_NUMBER)
+        with run_on_commit():
+            self.client.post(
+                reverse('posts:add_comment', args=[post.pk]),
+                {'text': 'Свежий комментарий'},
+            )
+        comments, _ = comment_page(post.pk, COMMENTS_NUMBER)
+        self.assertEqual(
+            [comment.text for comment in comments], ['Свежий комментарий']
+        )
+
+    def test_new_comment_ends_the_thread(self):
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Свежий комментарий'
+        )
+        _, next_cursor = comment_page(self.post.pk, COMMENTS_NUMBER)
+        comments, _ = comment_page(
+            self.post.pk, COMMENTS_NUMBER, next_cursor
+        )
+        self.assertEqual(comments[-1].text, 'Свежий комментарий')
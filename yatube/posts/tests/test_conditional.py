@@ -0,0 +1,120 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+from ..models import Comment, Group, Post, User
+from .utils import run_on_commit
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            description='Описание',
+            slug='test-slug'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Текст',
+            group=cls.group,
+        )
+        cls.feeds = (
+            reverse('posts:main'),
+            reverse('posts:group', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user}),
+        )
+        cls.detail = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def revalidate(self, url, response):
+        return self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+
+    def test_feeds_answer_304_from_cache_alone(self):
+        for url in self.feeds:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.has_header('Last-Modified'))
+                with self.assertNumQueries(0):
+                    again = self.revalidate(url, response)
+                self.assertEqual(again.status_code, 304)
+                self.assertEqual(again.templates, [])
+                self.assertEqual(again.content, b'')
+
+    def test_post_detail_answers_304_after_one_query(self):
+        response = self.guest_client.get(self.detail)
+        with self.assertNumQueries(1):
+            again = self.revalidate(self.detail, response)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.templates, [])
+
+    def test_new_post_changes_feed_validators(self):
+        responses = [self.guest_client.get(url) for url in self.feeds]
+        with run_on_commit():
+            Post.objects.create(
+                author=self.user, text='Новый', group=self.group
+            )
+        for url, response in zip(self.feeds, responses):
+            with self.subTest(url=url):
+                again = self.revalidate(url, response)
+                self.assertEqual(again.status_code, 200)
+                self.assertNotEqual(again['ETag'], response['ETag'])
+
+    def test_comment_changes_post_detail_validators(self):
+        response = self.guest_client.get(self.detail)
+        with run_on_commit():
+            Comment.objects.create(
+                post=self.post, author=self.user, text='Ок'
+            )
+        again = self.revalidate(self.detail, response)
+        self.assertEqual(again.status_code, 200)
+        self.assertContains(again, 'Ок')
+
+    def test_if_modified_since(self):
+        url = self.feeds[0]
+        self.guest_client.get(url)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_users_get_private_validators(self):
+        client = Client()
+        client.force_login(self.user)
+        for url in (*self.feeds, self.detail):
+            with self.subTest(url=url):
+                guest = self.guest_client.get(url)
+                response = client.get(url)
+                self.assertNotEqual(response['ETag'], guest['ETag'])
+                self.assertIn('private', response['Cache-Control'])
+                again = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(again.status_code, 304)
+
+    def test_new_csrf_token_changes_post_detail_validators(self):
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(self.detail)
+        # A login rotates the token in the CSRF cookie.
+        client.cookies[settings.CSRF_COOKIE_NAME] = 'rotated'
+        again = client.get(self.detail, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200)
+
+    def test_missing_post_is_still_404(self):
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': 0}),
+            HTTP_IF_NONE_MATCH='"*"',
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,70 @@
+from core.middleware.duplicate_queries import (
+    QueryRecorder, fingerprint, query_budget
+)
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import Client, TestCase
+from django.urls import reverse
+from ..models import Comment, Group, Post, User
+
+
+class FingerprintTests(TestCase):
+    def test_literals_and_in_lists_are_normalized(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s) AND a = 'x'"),
+            fingerprint('SELECT *  FROM t WHERE id IN (%s) AND a = 12'),
+        )
+
+
+class DuplicateQueryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(5)
+        ]
+        for author in authors:
+            post = Post.objects.create(
+                author=author, group=cls.group, text='Текст'
+            )
+        for author in authors:
+            Comment.objects.create(post=post, author=author, text='Текст')
+        cls.post = post
+        cls.author = authors[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_template_line_of_n_plus_one_is_reported(self):
+        template = Template(
+            '{% for post in posts %}\n{{ post.author.username }}{% endfor %}'
+        )
+        with QueryRecorder() as recorder:
+            template.render(Context({'posts': Post.objects.all()}))
+        (sql, count, (line, stack)), = recorder.duplicates(3)
+        self.assertEqual(count, 5)
+        self.assertTrue(line.endswith(':2'))
+
+    def test_budget_fails_on_duplicates(self):
+        with self.assertRaisesMessage(AssertionError, 'test_duplicate'):
+            with query_budget(duplicates=3):
+                for post in Post.objects.all():
+                    post.author.username
+
+    def test_feeds_do_not_repeat_queries(self):
+        client = Client()
+        client.force_login(self.author)
+        urls = (
+            reverse('posts:main'),
+            reverse('posts:group', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with query_budget(duplicates=1):
+                    response = client.get(url)
+                self.assertNotIn('X-Duplicate-Queries', response)
@@ -0,0 +1,72 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from ..models import Comment, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='export.gif', content=b'GIF89a', content_type='image/gif'
+            ),
+        )
+        Post.objects.create(author=cls.reader, text='Чужой пост')
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.author, text='Свой комментарий'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def rows(self, lines):
+        return [json.loads(line) for line in lines.splitlines()]
+
+    def test_command_exports_posts_then_comments(self):
+        out = StringIO()
+        call_command('export_posts', 'auth', chunk_size=1, stdout=out)
+        rows = self.rows(out.getvalue())
+        self.assertEqual(
+            [(row['type'], row['id']) for row in rows],
+            [('post', self.post.pk), ('comment', self.comment.pk)],
+        )
+        self.assertEqual(rows[0]['image'], self.post.image.name)
+        self.assertNotIn('image_data', rows[0])
+
+    def test_endpoint_inlines_images(self):
+        response = self.client.get(
+            reverse('posts:profile_export', args=['auth']),
+            {'inline_images': ''},
+        )
+        self.assertTrue(response.streaming)
+        rows = self.rows(b''.join(response.streaming_content).decode())
+        self.assertEqual(rows[0]['image_data'], 'R0lGODlh')
+
+    def test_endpoint_is_private(self):
+        url = reverse('posts:profile_export', args=['reader'])
+        response = self.client.get(url)
+        self.assertRedirects(
+            response, reverse('posts:profile', args=['reader'])
+        )
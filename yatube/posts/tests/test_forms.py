@@ -11,7 +11,7 @@ from ..forms import PostForm
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class PostFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -80,12 +80,9 @@ class PostFormTests(TestCase):
         self.assertEqual(new_post.group.id, form_data['group'])
         self.assertEqual(new_post.author, self.post.author)
         self.assertEqual(Post.objects.count(), posts_count + 1)
-        self.assertTrue(
-            Post.objects.filter(
-                author=self.post.author,
-                group=self.group,
-                image='posts/small.gif'
-            ).exists()
+        self.assertRegex(
+            new_post.image.name,
+            r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$',
         )
 
     def test_create_post_guest_client(self):
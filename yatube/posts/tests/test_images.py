@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, ImageFile
+from ..forms import PostForm
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def photo(name='photo.jpg', size=(1200, 800)):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Повёрнута на 90°
+    exif[0x010F] = 'Phone'
+    image = BytesIO()
+    Image.new('RGB', size, 'red').save(image, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, image.getvalue(), 'image/jpeg')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_MAX_SIZE=300, THUMBNAIL_WORKERS=0
+)
+class ImageIngestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create(self, upload):
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Фото', 'image': upload}
+        )
+        return Post.objects.latest('pk')
+
+    def test_upload_is_resized_rotated_and_stripped(self):
+        post = self.create(photo())
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (200, 300))
+            self.assertFalse(image.getexif())
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.create(photo('first.jpg'))
+        second = self.create(photo('second.jpg'))
+        self.assertEqual(first.image.name, second.image.name)
+        stored = [
+            filename
+            for _, _, files in os.walk(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+            for filename in files
+        ]
+        self.assertEqual(stored, [os.path.basename(first.image.name)])
+
+    def test_transparent_png_is_flattened(self):
+        image = BytesIO()
+        Image.new('RGBA', (10, 10), (0, 0, 0, 0)).save(image, 'PNG')
+        post = self.create(
+            SimpleUploadedFile('clear.png', image.getvalue(), 'image/png')
+        )
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.getpixel((5, 5)), (255, 255, 255))
+
+    def test_truncated_upload_is_a_form_error(self):
+        data = photo().read()
+        form = PostForm(
+            {'text': 'Фото'},
+            {'image': SimpleUploadedFile(
+                'cut.jpg', data[:len(data) // 2], 'image/jpeg'
+            )},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=10_000)
+    def test_oversized_png_is_refused_before_decoding(self):
+        image = BytesIO()
+        Image.new('RGB', (200, 200), 'red').save(image, 'PNG')
+        upload = SimpleUploadedFile('big.png', image.getvalue(), 'image/png')
+        with mock.patch.object(ImageFile.ImageFile, 'load') as load:
+            form = PostForm({'text': 'Фото'}, {'image': upload})
+            self.assertFalse(form.is_valid())
+        load.assert_not_called()
+        self.assertIn('image', form.errors)
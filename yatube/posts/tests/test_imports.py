@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from .. import purging
+from ..models import (
+    AuthorStats, Comment, Follow, Group, Post, TimelineEntry, User
+)
+
+ROWS = [
+    {'type': 'group', 'title': 'Группа', 'slug': 'group',
+     'description': 'Описание'},
+    {'type': 'post', 'id': 100, 'author': 'writer', 'group': 'group',
+     'text': 'Импортированный пост', 'pub_date': '2020-01-02T03:04:05Z'},
+    {'type': 'comment', 'post': 100, 'author': 'reader',
+     'text': 'Импортированный комментарий'},
+    {'type': 'follow', 'user': 'reader', 'author': 'writer'},
+]
+
+
+class ImportContentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def test_ndjson_import_rebuilds_derived_data(self):
+        path = self.write(
+            'content.ndjson', '\n'.join(json.dumps(row) for row in ROWS)
+        )
+        call_command('import_content', path, batch_size=1, stdout=StringIO())
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.author.username, 'writer')
+        self.assertEqual(post.group, Group.objects.get(slug='group'))
+        self.assertEqual(
+            post.pub_date, datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        )
+        self.assertTrue(Comment.objects.filter(post=post).exists())
+        reader = User.objects.get(username='reader')
+        self.assertTrue(
+            Follow.objects.filter(user=reader, author=post.author).exists()
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=post.author).follower_count, 1
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists()
+        )
+
+    def test_import_purges_proxied_pages(self):
+        path = self.write(
+            'content.ndjson', '\n'.join(json.dumps(row) for row in ROWS)
+        )
+        with mock.patch.object(purging, 'purge') as purge:
+            call_command('import_content', path, stdout=StringIO())
+        writer = User.objects.get(username='writer')
+        reader = User.objects.get(username='reader')
+        self.assertEqual(set(purge.call_args[0]), {
+            'posts',
+            'group-group',
+            'post-100',
+            f'author-{writer.pk}',
+            f'author-{reader.pk}',
+        })
+
+    def test_csv_import_with_type(self):
+        path = self.write(
+            'posts.csv', 'author,text,group\nwriter,Пост из CSV,\n'
+        )
+        call_command('import_content', path, type='post', stdout=StringIO())
+        post = Post.objects.get(text='Пост из CSV')
+        self.assertIsNone(post.group)
+        self.assertEqual(post.author.stats.post_count, 1)
+
+    def test_unknown_group_is_reported(self):
+        path = self.write('posts.ndjson', json.dumps(
+            {'type': 'post', 'author': 'writer', 'text': 'Пост',
+             'group': 'missing'}
+        ))
+        with self.assertRaises(CommandError):
+            call_command('import_content', path, stdout=StringIO())
+
+    def test_export_can_be_imported_back(self):
+        author = User.objects.create_user(username='auth')
+        post = Post.objects.create(author=author, text='Пост для выгрузки')
+        Comment.objects.create(post=post, author=author, text='Комментарий')
+        out = StringIO()
+        call_command('export_posts', 'auth', stdout=out)
+        author.delete()
+        path = self.write('export.ndjson', out.getvalue())
+        call_command('import_content', path, stdout=StringIO())
+        imported = Post.objects.get(pk=post.pk)
+        self.assertEqual(imported.pub_date, post.pub_date)
+        self.assertEqual(imported.comments.get().text, 'Комментарий')
@@ -0,0 +1,68 @@
+import json
+import logging
+from unittest import mock
+
+from core.middleware import instrumentation
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from ..models import Post, User
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.clear()
+        self.client = Client()
+        # Keep the JSON lines out of the test output.
+        quiet = mock.patch.object(
+            instrumentation.logger, 'handlers', [logging.NullHandler()]
+        )
+        quiet.start()
+        self.addCleanup(quiet.stop)
+
+    def test_log_is_written_at_info(self):
+        self.assertTrue(instrumentation.logger.isEnabledFor(logging.INFO))
+
+    def test_request_is_recorded(self):
+        with self.assertLogs('yatube.requests', 'INFO') as logs:
+            self.client.get(reverse('posts:main'))
+        record, = instrumentation.recent()
+        self.assertEqual(record['view'], 'posts:main')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+        self.assertLessEqual(len(record['slow_queries']), 3)
+        self.assertEqual(
+            json.loads(logs.records[0].getMessage())['view'], 'posts:main'
+        )
+
+    def test_cached_feed_hits_cache(self):
+        self.client.get(reverse('posts:main'))
+        self.client.get(reverse('posts:main'))
+        second = instrumentation.recent()[-1]
+        self.assertEqual(second['queries'], 0)
+        self.assertGreater(second['cache_hits'], 0)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_skipped(self):
+        self.client.get(reverse('posts:main'))
+        self.assertEqual(instrumentation.recent(), [])
+
+    def test_summary_is_for_staff_only(self):
+        url = reverse('core:instrumentation')
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        self.client.get(reverse('posts:main'))
+        views = self.client.get(url).json()['views']
+        self.assertIn('posts:main', [row['view'] for row in views])
@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from .. import media, thumbnails
+from ..models import MediaFile, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
+
+
+def upload(content=SMALL_GIF, name='small.gif'):
+    return SimpleUploadedFile(name, content, 'image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class MediaStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(os.path.join(TEMP_MEDIA_ROOT, 'posts'),
+                      ignore_errors=True)
+
+    def create(self, content=SMALL_GIF, name='small.gif'):
+        return Post.objects.create(
+            author=self.user, text='Текст', image=upload(content, name)
+        )
+
+    def references(self, name):
+        return MediaFile.objects.get(name=name).references
+
+    def test_same_content_is_stored_once_and_counted(self):
+        first = self.create(name='first.gif')
+        second = self.create(name='second.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name,
+            r'^posts/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.gif$',
+        )
+        self.assertTrue(os.path.exists(first.image.path))
+        self.assertEqual(self.references(first.image.name), 2)
+
+    def test_edit_and_delete_release_references(self):
+        first = self.create()
+        second = self.create()
+        old_name = first.image.name
+        first.image = upload(OTHER_GIF)
+        first.save()
+        self.assertEqual(self.references(old_name), 1)
+        self.assertEqual(self.references(first.image.name), 1)
+        second.delete()
+        self.assertEqual(self.references(old_name), 0)
+        # Unreferenced files stay until they are collected.
+        self.assertTrue(os.path.exists(os.path.join(TEMP_MEDIA_ROOT,
+                                                    old_name)))
+
+    def test_collect_deletes_unreferenced_files_only(self):
+        kept = self.create()
+        orphan = self.create(OTHER_GIF)
+        orphan_path = orphan.image.path
+        orphan.delete()
+        self.assertEqual(media.collect(), [])
+        self.assertEqual(media.collect(grace=0), [orphan.image.name])
+        self.assertFalse(os.path.exists(orphan_path))
+        self.assertFalse(MediaFile.objects.filter(
+            name=orphan.image.name).exists())
+        self.assertTrue(os.path.exists(kept.image.path))
+
+    def test_collect_keeps_referenced_files_with_drifted_counters(self):
+        post = self.create()
+        MediaFile.objects.all().delete()
+        self.assertEqual(media.collect(grace=0), [])
+        self.assertEqual(media.reconcile(), 1)
+        self.assertEqual(self.references(post.image.name), 1)
+
+    def test_duplicates_share_thumbnails_until_collected(self):
+        first = self.create()
+        thumbnails.generate(first.pk)
+        second = self.create()
+        self.assertEqual(
+            thumbnails.thumbnail_url(second, 'wide'),
+            thumbnails.thumbnail_url(first, 'wide'),
+        )
+        self.assertNotEqual(
+            thumbnails.thumbnail_url(second, 'wide'), second.image.url
+        )
+        thumbnail = os.path.join(
+            TEMP_MEDIA_ROOT,
+            thumbnails.thumbnail_url(first, 'wide')[len(settings.MEDIA_URL):],
+        )
+        self.assertTrue(os.path.exists(thumbnail))
+        first.delete()
+        second.delete()
+        media.collect(grace=0)
+        self.assertFalse(os.path.exists(thumbnail))
+        self.assertEqual(
+            thumbnails.thumbnail_url(second, 'wide'), second.image.url
+        )
+
+    def test_command_dry_run_keeps_files(self):
+        post = self.create()
+        path = post.image.path
+        post.delete()
+        out = StringIO()
+        call_command('collect_media', '--grace=0', '--dry-run', stdout=out)
+        self.assertIn(post.image.name, out.getvalue())
+        self.assertTrue(os.path.exists(path))
+        call_command('collect_media', '--grace=0', stdout=StringIO())
+        self.assertFalse(os.path.exists(path))
+
+    def test_command_dry_run_keeps_drifted_counters(self):
+        post = self.create()
+        MediaFile.objects.all().delete()
+        out = StringIO()
+        call_command('collect_media', '--grace=0', '--dry-run', stdout=out)
+        self.assertIn('к исправлению 1', out.getvalue())
+        self.assertFalse(MediaFile.objects.exists())
+        call_command('collect_media', '--grace=0', stdout=StringIO())
+        self.assertEqual(self.references(post.image.name), 1)
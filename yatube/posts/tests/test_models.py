@@ -1,5 +1,6 @@
+from django.db import IntegrityError
 from django.test import TestCase
-from ..models import Group, Post, User
+from ..models import Follow, Group, Post, User
 
 
 class PostModelTests(TestCase):
@@ -25,3 +26,9 @@ class PostModelTests(TestCase):
         group = PostModelTests.group
         exp_object_name_title = group.title
         self.assertEqual(exp_object_name_title, str(group))
+
+    def test_follow_is_unique(self):
+        author = User.objects.create_user(username='author')
+        Follow.objects.create(user=self.user, author=author)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=self.user, author=author)
@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from ..models import Post, Group, User
+from ..paginators import CursorPaginator, NEXT
+from ..views import NUMBER
+
+
+POSTS_COUNT = 25
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            description='Описание',
+            slug='test-slug'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=cls.user, group=cls.group)
+            for i in range(POSTS_COUNT)
+        )
+        cls.expected = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def walk(self, paginator_factory):
+        seen = []
+        cursor = None
+        while True:
+            paginator = paginator_factory()
+            page = paginator.get_cursor_page(cursor)
+            seen.extend(page.object_list)
+            if not page.has_next():
+                return seen, page
+            cursor = paginator.next_cursor
+
+    def test_walk_forward_returns_every_post_once(self):
+        seen, last_page = self.walk(
+            lambda: CursorPaginator(Post.objects.all(), NUMBER)
+        )
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(last_page), POSTS_COUNT % NUMBER)
+        self.assertTrue(last_page.has_previous())
+
+    def test_previous_cursor_returns_previous_page(self):
+        paginator = CursorPaginator(Post.objects.all(), NUMBER)
+        paginator.get_cursor_page(None)
+        second = CursorPaginator(Post.objects.all(), NUMBER)
+        second.get_cursor_page(paginator.next_cursor)
+        back = CursorPaginator(Post.objects.all(), NUMBER)
+        page = back.get_cursor_page(second.previous_cursor)
+        self.assertEqual(list(page), self.expected[:NUMBER])
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_cursor_page_does_not_count(self):
+        paginator = CursorPaginator(Post.objects.all(), NUMBER)
+        with self.assertNumQueries(1):
+            page = paginator.get_cursor_page(
+                paginator.encode_cursor(NEXT, self.expected[NUMBER - 1])
+            )
+            self.assertTrue(page.has_next())
+        self.assertEqual(list(page), self.expected[NUMBER:NUMBER * 2])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), NUMBER)
+        page = paginator.get_cursor_page('не-курсор')
+        self.assertEqual(list(page), self.expected[:NUMBER])
+
+    def test_views_follow_cursor_links(self):
+        urls = (
+            reverse('posts:main'),
+            reverse('posts:group', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                response = self.guest_client.get(url)
+                cursor = response.context['page_obj'].paginator.next_cursor
+                self.assertContains(response, f'?cursor={cursor}')
+                response = self.guest_client.get(url, {'cursor': cursor})
+                self.assertEqual(
+                    list(response.context['page_obj']),
+                    self.expected[NUMBER:NUMBER * 2]
+                )
+
+    @override_settings(POSTS_PAGE_NUMBER_LINKS=True)
+    def test_page_number_links_setting(self):
+        response = self.guest_client.get(reverse('posts:main'))
+        self.assertFalse(response.context['page_obj'].paginator.keyset)
+        self.assertContains(response, '?page=3')
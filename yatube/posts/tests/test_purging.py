@@ -0,0 +1,179 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+from django.urls import reverse
+from core import background
+from .. import purging
+from ..models import Comment, Follow, Group, Post, User
+from ..purging import HEADER, LocalPurgeReceiver, send_to_proxy
+
+
+class SurrogateHeaderTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            description='Описание',
+            slug='test-slug'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Текст', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_anonymous_feeds_are_public_and_tagged(self):
+        pages = {
+            reverse('posts:main'): 'posts',
+            reverse('posts:group', kwargs={'slug': self.group.slug}):
+                'group-test-slug',
+            reverse('posts:profile', kwargs={'username': self.user}):
+                f'author-{self.user.pk}',
+        }
+        for url, feed_key in pages.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                keys = response[HEADER].split()
+                self.assertEqual(keys[0], feed_key)
+                self.assertIn(f'post-{self.post.pk}', keys)
+                self.assertIn('group-test-slug', keys)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('max-age=60', response['Cache-Control'])
+
+    def test_user_pages_stay_private(self):
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('posts:main'))
+        self.assertFalse(response.has_header(HEADER))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('public', response['Cache-Control'])
+        self.assertNotIn('max-age', response['Cache-Control'])
+
+
+class PurgeTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Заголовок', description='Описание', slug='test-slug'
+        )
+        self.other = Group.objects.create(
+            title='Другая', description='Описание', slug='other'
+        )
+
+    def test_new_post_purges_its_feeds(self):
+        with LocalPurgeReceiver() as purged:
+            post = Post.objects.create(
+                author=self.user, text='Текст', group=self.group
+            )
+        self.assertEqual(purged.keys, {
+            'posts',
+            f'author-{self.user.pk}',
+            f'post-{post.pk}',
+            'group-test-slug',
+        })
+
+    def test_moving_post_purges_both_groups(self):
+        post = Post.objects.create(
+            author=self.user, text='Текст', group=self.group
+        )
+        with LocalPurgeReceiver() as purged:
+            post.group = self.other
+            post.save()
+        self.assertTrue({'group-test-slug', 'group-other', f'post-{post.pk}'}
+                        <= purged.keys)
+
+    def test_comment_and_follow_purge_profiles(self):
+        post = Post.objects.create(author=self.user, text='Текст')
+        with LocalPurgeReceiver() as purged:
+            Comment.objects.create(post=post, author=self.reader, text='Ок')
+        self.assertEqual(
+            purged.keys, {f'post-{post.pk}', f'author-{self.reader.pk}'}
+        )
+        with LocalPurgeReceiver() as purged:
+            Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(
+            purged.keys,
+            {f'author-{self.reader.pk}', f'author-{self.user.pk}'},
+        )
+
+    def test_renamed_group_purges_old_and_new_slug(self):
+        with LocalPurgeReceiver() as purged:
+            self.group.slug = 'renamed'
+            self.group.save()
+        self.assertEqual(purged.keys, {'group-test-slug', 'group-renamed'})
+
+    def test_nothing_is_purged_before_commit(self):
+        with LocalPurgeReceiver() as purged:
+            with transaction.atomic():
+                Post.objects.create(author=self.user, text='Текст')
+                self.assertEqual(purged.purges, [])
+            self.assertEqual(len(purged.purges), 1)
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    Post.objects.create(author=self.user, text='Текст')
+                    raise RuntimeError
+            self.assertEqual(len(purged.purges), 1)
+
+
+class ProxyStub(BaseHTTPRequestHandler):
+    received = []
+
+    def do_PURGE(self):
+        self.received.append((self.command, self.headers[HEADER]))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(PROXY_PURGE_IN_BACKGROUND=False)
+class SendToProxyTests(TestCase):
+    def test_purge_request_carries_keys(self):
+        server = HTTPServer(('127.0.0.1', 0), ProxyStub)
+        threading.Thread(target=server.handle_request, daemon=True).start()
+        url = 'http://%s:%s/' % server.server_address
+        try:
+            with override_settings(PROXY_PURGE_URL=url):
+                send_to_proxy(None, keys=['post-1', 'posts'])
+        finally:
+            server.server_close()
+        self.assertEqual(ProxyStub.received, [('PURGE', 'post-1 posts')])
+
+    def test_unreachable_proxy_is_logged(self):
+        with override_settings(PROXY_PURGE_URL='http://127.0.0.1:9/'):
+            with self.assertLogs('posts.purging', 'WARNING'):
+                send_to_proxy(None, keys=['posts'])
+
+    @override_settings(PROXY_PURGE_URL='http://proxy/',
+                       PROXY_PURGE_IN_BACKGROUND=True)
+    def test_purges_wait_in_background_and_coalesce(self):
+        started, release = threading.Event(), threading.Event()
+        sent = []
+
+        def slow_proxy(request, timeout):
+            sent.append(request.get_header(HEADER.capitalize()))
+            started.set()
+            release.wait(5)
+            return mock.MagicMock()
+
+        with mock.patch.object(purging, 'urlopen', side_effect=slow_proxy):
+            send_to_proxy(None, keys=['posts'])
+            self.assertTrue(started.wait(5))
+            # The request thread does not wait for the proxy.
+            send_to_proxy(None, keys=['post-1'])
+            send_to_proxy(None, keys=['post-2', 'posts'])
+            release.set()
+            background.executor('purging', 1).submit(lambda: None).result(5)
+        self.assertEqual(sent, ['posts', 'post-1 post-2 posts'])
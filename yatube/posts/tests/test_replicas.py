@@ -0,0 +1,129 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from core.middleware import instrumentation
+from core.replication import replicate
+from core.routers import PIN_COOKIE, ReplicaRouter, replica_reads
+from ..caching import bump, generations
+from ..models import Post, User
+
+REPLICA = 'replica'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], REPLICA_MAX_LAG=0)
+class ReplicaRoutingTests(TransactionTestCase):
+    """A second SQLite file that only changes on ``replicate()``."""
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.databases[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': cls.replica_path,
+        }
+        connections.ensure_defaults(REPLICA)
+        connections.prepare_test_settings(REPLICA)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        os.remove(cls.replica_path)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='auth')
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        replicate()
+        self.guest_client = Client()
+
+    def test_feeds_read_the_replica(self):
+        Post.objects.create(author=self.author, text='Ещё не на реплике')
+        for url in (reverse('posts:main'),
+                    reverse('posts:profile', args=[self.author])):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertNotContains(response, 'Ещё не на реплике')
+        replicate()
+        cache.clear()
+        response = self.guest_client.get(reverse('posts:main'))
+        self.assertContains(response, 'Ещё не на реплике')
+
+    @override_settings(REPLICA_MAX_LAG=60)
+    def test_writer_reads_own_writes(self):
+        response = self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Мой новый пост'}
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 60)
+        response = self.author_client.get(
+            reverse('posts:profile', args=[self.author])
+        )
+        self.assertContains(response, 'Мой новый пост')
+
+    def test_expired_pin_reads_the_replica(self):
+        Post.objects.create(author=self.author, text='Ещё не на реплике')
+        self.author_client.cookies[PIN_COOKIE] = str(time.time() - 1)
+        response = self.author_client.get(
+            reverse('posts:profile', args=[self.author])
+        )
+        self.assertNotContains(response, 'Ещё не на реплике')
+
+    @override_settings(REPLICA_MAX_LAG=60)
+    def test_fresh_feeds_are_rendered_from_primary(self):
+        Post.objects.create(author=self.author, text='Только что')
+        response = self.guest_client.get(reverse('posts:main'))
+        self.assertContains(response, 'Только что')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_reads_do_not_pin(self):
+        response = self.guest_client.get(reverse('posts:main'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+    def test_replica_queries_are_measured(self):
+        instrumentation.clear()
+        with mock.patch.object(instrumentation.logger, 'handlers', []):
+            self.guest_client.get(reverse('posts:main'))
+        record, = instrumentation.recent()
+        self.assertGreater(record['queries'], 0)
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'yatube_test_cache',
+        },
+    })
+    def test_database_cache_stays_on_primary(self):
+        call_command('createcachetable', verbosity=0)
+        before = generations(['posts'])[0]
+        replicate()
+        bump('posts')
+        with replica_reads():
+            self.assertEqual(generations(['posts'])[0], before + 1)
+        response = self.guest_client.get(reverse('posts:main'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTests(TransactionTestCase):
+    def test_writes_and_migrations_stay_on_primary(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertIsNone(router.db_for_read(Post))
+        self.assertFalse(router.allow_migrate(REPLICA, 'posts'))
+        self.assertIsNone(router.allow_migrate('default', 'posts'))
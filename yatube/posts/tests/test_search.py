@@ -0,0 +1,91 @@
+from io import StringIO
+from unittest import SkipTest
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from .. import search
+from ..models import Group, Post, SearchPosting, User
+
+
+class SearchMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        search.has_fts_table.cache_clear()
+        call_command('rebuild_search_index', stdout=StringIO())
+        cls.author = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.once = Post.objects.create(
+            author=cls.author, text='Кошка спит на диване'
+        )
+        cls.twice = Post.objects.create(
+            author=cls.other, group=cls.group,
+            text='Кошка, снова кошка и собака'
+        )
+        Post.objects.create(author=cls.author, text='Собака лает')
+
+    def setUp(self):
+        self.client = Client()
+
+    def results(self, **params):
+        response = self.client.get(reverse('posts:search'), params)
+        return list(response.context['page_obj'])
+
+    def test_ranked_by_term_frequency(self):
+        self.assertEqual(self.results(q='КОШКА'), [self.twice, self.once])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.results(q='кошка собака'), [self.twice])
+
+    def test_filters_by_group_and_author(self):
+        self.assertEqual(self.results(q='кошка', group='group'), [self.twice])
+        self.assertEqual(self.results(q='кошка', author='auth'), [self.once])
+
+    def test_cursor_pages(self):
+        paginator = search.SearchPaginator('кошка', 1)
+        first = paginator.get_cursor_page(None)
+        second = search.SearchPaginator('кошка', 1).get_cursor_page(
+            paginator.next_cursor
+        )
+        self.assertEqual(list(first) + list(second), [self.twice, self.once])
+        self.assertFalse(second.has_next())
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.create(author=self.author, text='Попугай')
+        self.assertEqual(self.results(q='попугай'), [post])
+        post.text = 'Канарейка'
+        post.save()
+        self.assertEqual(self.results(q='попугай'), [])
+        self.assertEqual(self.results(q='канарейка'), [post])
+        post.delete()
+        self.assertEqual(self.results(q='канарейка'), [])
+
+
+@override_settings(POSTS_SEARCH_BACKEND='index')
+class TokenIndexSearchTests(SearchMixin, TestCase):
+    def test_postings_are_stored(self):
+        self.assertEqual(
+            SearchPosting.objects.get(term='кошка', post=self.twice).frequency,
+            2
+        )
+
+
+class FTS5SearchTests(SearchMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        search.has_fts_table.cache_clear()
+        if search.backend() != 'fts5':
+            raise SkipTest('SQLite собран без FTS5')
+        super().setUpClass()
+
+    def test_backend_is_looked_up_once(self):
+        search.backend()
+        with self.assertNumQueries(0):
+            search.backend()
+
+    def test_postings_are_not_used(self):
+        self.assertFalse(SearchPosting.objects.exists())
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+
+class SQLitePragmaTests(SimpleTestCase):
+    def connect(self):
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        self.addCleanup(lambda: [
+            os.remove(path + suffix) for suffix in ('-wal', '-shm')
+            if os.path.exists(path + suffix)
+        ])
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': path})
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        return wrapper.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_new_connections_are_tuned(self):
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -64 * 1024)
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 250})
+    def test_pragmas_come_from_settings(self):
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 250)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
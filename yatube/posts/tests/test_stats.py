@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from ..models import AuthorStats, Comment, Follow, Post, User
+
+
+class AuthorStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Текст')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_counters_follow_creates_and_deletes(self):
+        post = Post.objects.create(author=self.author, text='Ещё пост')
+        Comment.objects.create(author=self.reader, post=post, text='Ого')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        author_stats = self.stats(self.author)
+        reader_stats = self.stats(self.reader)
+        self.assertEqual(author_stats.post_count, 2)
+        self.assertEqual(author_stats.follower_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.assertEqual(reader_stats.comment_count, 1)
+        follow.delete()
+        post.delete()
+        author_stats = self.stats(self.author)
+        reader_stats = self.stats(self.reader)
+        self.assertEqual(author_stats.post_count, 1)
+        self.assertEqual(author_stats.follower_count, 0)
+        self.assertEqual(reader_stats.following_count, 0)
+        self.assertEqual(reader_stats.comment_count, 0)
+
+    def delete_with_comments(self, total):
+        post = Post.objects.create(author=self.author, text='Обсуждаемый')
+        Comment.objects.bulk_create(
+            Comment(author=author, post=post, text='Ого')
+            for author in [self.reader, self.author] * total
+        )
+        # bulk_create sends no post_save, count the comments in by hand.
+        AuthorStats.objects.update(comment_count=F('comment_count') + total)
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        return len(queries)
+
+    def test_post_delete_settles_comments_at_once(self):
+        Comment.objects.create(author=self.reader, post=self.post, text='А')
+        few = self.delete_with_comments(1)
+        many = self.delete_with_comments(25)
+        self.assertEqual(few, many)
+        self.assertEqual(self.stats(self.reader).comment_count, 1)
+        self.assertEqual(self.stats(self.author).comment_count, 0)
+
+    def test_comment_delete_changes_counter(self):
+        comment = Comment.objects.create(
+            author=self.reader, post=self.post, text='Ого'
+        )
+        comment.delete()
+        self.assertEqual(self.stats(self.reader).comment_count, 0)
+
+    def test_profile_reads_counter(self):
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        AuthorStats.objects.filter(user=self.author).update(post_count=42)
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context['posts_count'], 42)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertContains(response, '<span >42</span>')
+
+    def test_reconcile_stats_fixes_drift(self):
+        AuthorStats.objects.filter(user=self.author).update(post_count=42)
+        AuthorStats.objects.filter(user=self.reader).delete()
+        call_command('reconcile_stats', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.stats(self.author).post_count, 1)
+        self.assertEqual(self.stats(self.reader).post_count, 0)
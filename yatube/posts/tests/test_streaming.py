@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from ..models import Group, Post, User
+
+
+class StreamingFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост номер {i}'
+            )
+            for i in range(5)
+        ]
+        cls.posts.reverse()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_profile_and_group_stream_every_post(self):
+        urls = (
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:group', args=[self.group.slug]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'stream': ''})
+                self.assertTrue(response.streaming)
+                content = self.content(response)
+                positions = [
+                    content.index(post.text) for post in self.posts
+                ]
+                self.assertEqual(positions, sorted(positions))
+                self.assertTrue(content.rstrip().endswith('</html>'))
+
+    @override_settings(POSTS_STREAM_PAGE_SIZE=3)
+    def test_stream_continues_from_cursor(self):
+        url = reverse('posts:profile', args=[self.author.username])
+        first = self.content(self.client.get(url, {'stream': ''}))
+        self.assertNotIn(self.posts[3].text, first)
+        cursor = first.split('cursor=', 1)[1].split('"', 1)[0]
+        second = self.content(
+            self.client.get(url, {'stream': '', 'cursor': cursor})
+        )
+        for post in self.posts[:3]:
+            self.assertNotIn(post.text, second)
+        for post in self.posts[3:]:
+            self.assertIn(post.text, second)
@@ -0,0 +1,156 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+from .. import images, thumbnails
+from ..models import Post, User
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'thumbnails'), ignore_errors=True
+        )
+        self.post = Post.objects.create(
+            author=User.objects.create_user(username='auth'),
+            text='Текст',
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            )
+        )
+
+    def test_original_image_until_thumbnail_is_ready(self):
+        self.assertEqual(
+            thumbnails.thumbnail_url(self.post, 'wide'), self.post.image.url
+        )
+
+    def test_miss_queues_thumbnails(self):
+        with mock.patch.object(thumbnails, 'enqueue') as enqueue:
+            thumbnails.variants(self.post, 'wide')
+        enqueue.assert_called_once_with(self.post.pk)
+
+    def test_miss_finds_thumbnails_in_storage(self):
+        thumbnails.generate(self.post.pk)
+        described = thumbnails.variants(self.post, 'wide')
+        # Another process, or this one after a restart.
+        cache.clear()
+        with mock.patch.object(thumbnails, 'enqueue') as enqueue:
+            self.assertEqual(
+                thumbnails.variants(self.post, 'wide'), described
+            )
+        enqueue.assert_not_called()
+
+    def test_enqueue_generates_every_geometry(self):
+        updated = self.post.updated
+        thumbnails.enqueue(self.post.pk)
+        for name in thumbnails.GEOMETRIES:
+            with self.subTest(name=name):
+                url = thumbnails.thumbnail_url(self.post, name)
+                self.assertNotEqual(url, self.post.image.url)
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.updated, updated)
+
+    def test_variants_come_from_one_decode(self):
+        with mock.patch.object(
+            images.Image, 'open', wraps=images.Image.open
+        ) as image_open:
+            thumbnails.generate(self.post.pk)
+        self.assertEqual(image_open.call_count, 1)
+
+    def test_variants_cover_every_width(self):
+        thumbnails.generate(self.post.pk)
+        for name, (width, height) in thumbnails.GEOMETRIES.items():
+            with self.subTest(name=name):
+                variants = thumbnails.variants(self.post, name)
+                self.assertEqual(
+                    (variants['width'], variants['height']), (width, height)
+                )
+                entries = variants['srcset'].split(', ')
+                self.assertEqual(
+                    [entry.rsplit(' ', 1)[1] for entry in entries],
+                    [f'{step}w' for step in (*thumbnails.WIDTHS, width)],
+                )
+                url = entries[0].rsplit(' ', 1)[0]
+                path = os.path.join(
+                    TEMP_MEDIA_ROOT, url[len(settings.MEDIA_URL):]
+                )
+                with Image.open(path) as variant:
+                    self.assertEqual(variant.format, 'JPEG')
+                    self.assertEqual(variant.width, thumbnails.WIDTHS[0])
+                self.assertEqual(
+                    [source['type'] for source in variants['sources']],
+                    [images.MIME_TYPES[image_format]
+                     for image_format in thumbnails.FORMATS[:-1]],
+                )
+
+    def test_pages_offer_srcset(self):
+        thumbnails.generate(self.post.pk)
+        response = self.client.get(f'/posts/{self.post.pk}/')
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, 'narrow-320.jpg 320w')
+
+
+class PictureTagTests(TestCase):
+    def render(self, image):
+        return Template(
+            '{% load responsive_images %}'
+            '{% picture image class="card-img" %}'
+        ).render(Context({'image': image}))
+
+    def test_sources_and_sizes(self):
+        html = self.render({
+            'src': '/wide-960.jpg',
+            'srcset': '/wide-320.jpg 320w, /wide-960.jpg 960w',
+            'width': 960,
+            'height': 339,
+            'sources': [{
+                'type': 'image/webp',
+                'srcset': '/wide-320.webp 320w, /wide-960.webp 960w',
+            }],
+        })
+        sizes = 'sizes="(max-width: 960px) 100vw, 960px"'
+        self.assertIn(
+            '<source type="image/webp" '
+            f'srcset="/wide-320.webp 320w, /wide-960.webp 960w" {sizes}>',
+            html,
+        )
+        self.assertInHTML(
+            '<img src="/wide-960.jpg" '
+            f'srcset="/wide-320.jpg 320w, /wide-960.jpg 960w" {sizes} '
+            'width="960" height="339" loading="lazy" class="card-img">',
+            html,
+        )
+
+    def test_original_image_without_srcset(self):
+        html = self.render({'src': '/media/posts/small.gif'})
+        self.assertInHTML(
+            '<img src="/media/posts/small.gif" loading="lazy" '
+            'class="card-img">',
+            html,
+        )
+        self.assertNotIn('srcset', html)
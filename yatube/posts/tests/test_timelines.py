@@ -0,0 +1,128 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from .. import timelines
+from ..models import AuthorStats, Post, Follow, TimelineEntry, User
+from .utils import run_on_commit
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follower = User.objects.create_user(username='follower')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.follower)
+
+    def timeline(self):
+        return list(
+            TimelineEntry.objects.filter(
+                user=self.follower
+            ).values_list('post_id', flat=True)
+        )
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}))
+        self.assertEqual(self.timeline(), [self.old_post.id])
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertEqual(self.timeline(), [])
+
+    def test_new_post_is_pushed_to_followers_only(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        Post.objects.create(author=self.stranger, text='Чужой пост')
+        self.assertEqual(self.timeline(), [post.id, self.old_post.id])
+
+    def test_follow_index_reads_timeline(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [self.old_post])
+
+    def test_rebuild_timelines_command(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.timeline(), [self.old_post.id])
+
+
+@override_settings(TIMELINE_CELEBRITY_THRESHOLD=2)
+class HybridTimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.star = User.objects.create_user(username='star')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.fan, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def test_celebrity_posts_are_not_pushed(self):
+        Post.objects.create(author=self.star, text='Звёздный пост')
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__author=self.star).exists()
+        )
+
+    def test_follow_feed_merges_pushed_and_pulled_posts(self):
+        posts = [
+            Post.objects.create(author=author, text=f'Пост {i}')
+            for i, author in enumerate(
+                [self.star, self.author, self.star, self.author, self.star]
+            )
+        ]
+        expected = sorted(
+            posts, key=lambda post: (post.pub_date, post.id), reverse=True
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), expected)
+
+    def test_dropping_below_threshold_keeps_pulling_until_backfilled(self):
+        post = Post.objects.create(author=self.star, text='Звёздный пост')
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        # The backfill waits for the commit, readers still pull meanwhile.
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+        timelines.push_mode(self.star.pk)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post=post
+            ).exists()
+        )
+        self.assertFalse(AuthorStats.objects.get(user=self.star).pulled)
+
+    @override_settings(TIMELINE_WORKERS=0)
+    def test_dropping_below_threshold_queues_backfill_after_commit(self):
+        post = Post.objects.create(author=self.star, text='Звёздный пост')
+        with run_on_commit():
+            Follow.objects.filter(user=self.fan, author=self.star).delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post=post
+            ).exists()
+        )
+
+    def test_threshold_is_read_from_author_stats(self):
+        self.assertTrue(AuthorStats.objects.get(user=self.star).pulled)
+        AuthorStats.objects.filter(user=self.star).update(follower_count=0)
+        self.assertFalse(timelines.is_celebrity(self.star.pk))
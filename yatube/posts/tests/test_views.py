@@ -1,15 +1,22 @@
+import shutil
+import tempfile
+
 from django import forms
-from django.test import Client, TestCase
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from ..models import Post, Group, Comment, Follow, User
 from ..views import NUMBER
+from .utils import run_on_commit
 
 
 NUMBER_COUNT = 13
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class PostViewsTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -45,6 +52,11 @@ class PostViewsTests(TestCase):
             author=cls.user,
         )
 
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
     def setUp(self):
         cache.clear()
         self.guest_client = Client()
@@ -223,15 +235,30 @@ class CacheTests(TestCase):
 
     def test_cache_main(self):
         first_cond = self.authorized_client.get(reverse('posts:main'))
-        post = Post.objects.get(id=1)
-        post.text = 'Тут поменяли текст'
-        post.save()
+        Post.objects.filter(id=self.post.id).update(text='Тут поменяли текст')
         second_cond = self.authorized_client.get(reverse('posts:main'))
         self.assertEqual(first_cond.content, second_cond.content)
         cache.clear()
         third_cond = self.authorized_client.get(reverse('posts:main'))
         self.assertNotEqual(first_cond.content, third_cond.content)
 
+    def test_post_save_invalidates_main(self):
+        first_cond = self.authorized_client.get(reverse('posts:main'))
+        self.post.text = 'Тут поменяли текст'
+        with run_on_commit():
+            self.post.save()
+        second_cond = self.authorized_client.get(reverse('posts:main'))
+        self.assertNotEqual(first_cond.content, second_cond.content)
+        self.assertContains(second_cond, 'Тут поменяли текст')
+
+    def test_guest_and_user_cached_separately(self):
+        authorized = self.authorized_client.get(reverse('posts:main'))
+        guest = self.guest_client.get(reverse('posts:main'))
+        self.assertNotEqual(authorized.content, guest.content)
+        self.assertIn('Cookie', guest['Vary'])
+        self.assertIn('private', authorized['Cache-Control'])
+        self.assertNotIn('private', guest.get('Cache-Control', ''))
+
 
 class FollowTests(TestCase):
 
@@ -274,3 +301,51 @@ class FollowTests(TestCase):
         post_list_2 = response.context.get('page_obj')
         single_post_2 = post_list_2[0]
         self.assertEqual(single_post_2, self.post)
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            description='Описание',
+            slug='test-slug'
+        )
+        for i in range(NUMBER_COUNT):
+            author = User.objects.create_user(
+                username=f'author-{i}', first_name='Имя', last_name='Фамилия'
+            )
+            Follow.objects.create(user=cls.user, author=author)
+            Post.objects.create(
+                text=f'Текст {i}',
+                group=Group.objects.create(
+                    title=f'Группа {i}',
+                    description='Описание',
+                    slug=f'group-{i}'
+                ),
+                author=author
+            )
+            Post.objects.create(text=f'Пост группы {i}', group=cls.group,
+                                author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feed_pages_have_fixed_query_budget(self):
+        author = User.objects.get(username='author-0')
+        # Сессия и пользователь стоят ещё два запроса на каждую страницу
+        budgets = {
+            reverse('posts:main'): 3,
+            reverse('posts:group', kwargs={'slug': self.group.slug}): 4,
+            reverse('posts:profile', kwargs={'username': author}): 5,
+            reverse('posts:follow_index'): 5,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    response = self.authorized_client.get(url)
+                self.assertTrue(response.context['page_obj'])
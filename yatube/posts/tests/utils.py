@@ -0,0 +1,11 @@
+from unittest import mock
+
+from django.db import transaction
+
+
+def run_on_commit():
+    """Run ``on_commit`` callbacks at once, a ``TestCase`` never commits."""
+    return mock.patch.object(
+        transaction, 'on_commit',
+        side_effect=lambda func, using=None: func(),
+    )
@@ -0,0 +1,196 @@
+import logging
+import posixpath
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core import background
+
+from . import images
+from .caching import bump_post_feeds
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Every thumbnail size the templates use, referred to by name
+GEOMETRIES = {
+    'wide': (960, 339),
+    'narrow': (900, 339),
+}
+# Narrower copies of every thumbnail, for srcset
+WIDTHS = (320, 480, 640)
+# Modern formats first, browsers take the first <source> they support
+FORMATS = [
+    image_format for image_format in ('AVIF', 'WEBP')
+    if images.can_encode(image_format)
+] + ['JPEG']
+
+
+def _ready_key(image_name, name):
+    # Stored images are named after their content, so posts with the same
+    # picture share thumbnails.
+    return f'thumbnail-variants:{name}:{image_name}'
+
+
+def _queued_key(post_id):
+    return f'thumbnail-queued:{post_id}'
+
+
+def _variant_dir(image_name):
+    return posixpath.join('thumbnails', posixpath.splitext(image_name)[0])
+
+
+def variants(post, name):
+    """Ready thumbnails of ``post`` for the ``picture`` template tag.
+
+    ``src`` is the largest JPEG, ``srcset`` every JPEG width and
+    ``sources`` the same for each modern format.  Until the thumbnails
+    are ready only ``src``, the original image, is there.
+
+    The cache may be another process's or may have been cleared, so a
+    miss looks for thumbnails already in storage before queueing them.
+    """
+    described = cache.get(_ready_key(post.image.name, name))
+    if described is None:
+        stored = _stored_variants(post.image.name)
+        if stored is None:
+            enqueue(post.pk)
+            return {'src': post.image.url}
+        cache.set_many(stored, None)
+        described = stored[_ready_key(post.image.name, name)]
+    return described
+
+
+def thumbnail_url(post, name):
+    """URL of a ready thumbnail, or of the original image until then."""
+    return variants(post, name)['src']
+
+
+def enqueue(post_id):
+    background.submit(
+        'thumbnails', settings.THUMBNAIL_WORKERS, generate, post_id,
+        queued_key=_queued_key(post_id),
+    )
+
+
+def _srcset(urls):
+    return ', '.join(f'{url} {width}w' for width, url in sorted(urls))
+
+
+def _widths(width):
+    return sorted({step for step in WIDTHS if step < width} | {width})
+
+
+def _describe(image_name, urls):
+    """Cache entries for every geometry from ``urls[name][format]``."""
+    described = {}
+    for name, (width, height) in GEOMETRIES.items():
+        jpegs = urls[name]['JPEG']
+        described[_ready_key(image_name, name)] = {
+            'src': max(jpegs)[1],
+            'srcset': _srcset(jpegs),
+            'width': width,
+            'height': height,
+            'sources': [
+                {
+                    'type': images.MIME_TYPES[image_format],
+                    'srcset': _srcset(urls[name][image_format]),
+                }
+                for image_format in FORMATS if image_format != 'JPEG'
+            ],
+        }
+    return described
+
+
+def _stored_variants(image_name):
+    """Describe the variants of ``image_name`` found in storage, or return
+    ``None`` unless every one of them is there.
+    """
+    directory = _variant_dir(image_name)
+    try:
+        if not default_storage.exists(directory):
+            return None
+    except SuspiciousFileOperation:
+        # A name set by hand, pointing outside the storage.
+        return None
+    found = set(default_storage.listdir(directory)[1])
+    urls = defaultdict(lambda: defaultdict(list))
+    for name, (width, _) in GEOMETRIES.items():
+        for step in _widths(width):
+            for image_format in FORMATS:
+                filename = f'{name}-{step}.{images.EXTENSIONS[image_format]}'
+                if filename not in found:
+                    return None
+                urls[name][image_format].append((
+                    step,
+                    default_storage.url(posixpath.join(directory, filename)),
+                ))
+    return _describe(image_name, urls)
+
+
+def _store_variants(image):
+    """Write every variant of ``image`` and describe them per geometry."""
+    urls = defaultdict(lambda: defaultdict(list))
+    directory = _variant_dir(image.name)
+    with image.storage.open(image.name) as source:
+        for name, width, image_format, data in images.variants(
+            source, GEOMETRIES, WIDTHS, FORMATS
+        ):
+            variant = posixpath.join(
+                directory,
+                f'{name}-{width}.{images.EXTENSIONS[image_format]}',
+            )
+            # The same content always makes the same variant.
+            if not default_storage.exists(variant):
+                variant = default_storage.save(variant, ContentFile(data))
+            urls[name][image_format].append(
+                (width, default_storage.url(variant))
+            )
+    return _describe(image.name, urls)
+
+
+def _generate(post_id):
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id
+    ).first()
+    if post is None or not post.image:
+        return
+    ready = cache.get_many(
+        [_ready_key(post.image.name, name) for name in GEOMETRIES]
+    )
+    if len(ready) == len(GEOMETRIES):
+        # Another post with the same picture has made them already.
+        return
+    cache.set_many(_store_variants(post.image), None)
+    # Cached cards and feeds still point at the original image.
+    Post.objects.filter(pk=post_id).update(updated=timezone.now())
+    bump_post_feeds(post)
+
+
+def generate(post_id):
+    try:
+        _generate(post_id)
+    except Exception:
+        # Left marked as queued, so pages do not retry a broken image on
+        # every view until the mark expires.
+        logger.exception('Не удалось подготовить миниатюры поста %s', post_id)
+    else:
+        cache.delete(_queued_key(post_id))
+
+
+def forget(image_name, storage):
+    """Delete the thumbnails of a stored image that is going away."""
+    cache.delete_many([_ready_key(image_name, name) for name in GEOMETRIES])
+    directory = _variant_dir(image_name)
+    if default_storage.exists(directory):
+        for filename in default_storage.listdir(directory)[1]:
+            default_storage.delete(posixpath.join(directory, filename))
+    # Thumbnails sorl.thumbnail made before the variants existed.
+    default.kvstore.delete(ImageFile(image_name, storage))
@@ -0,0 +1,197 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from core import background
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginators import CursorPaginator, keyset_slice
+
+
+def _insert(entries, batch_size=None):
+    batch_size = batch_size or settings.TIMELINE_BATCH_SIZE
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, batch_size))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def _celebrities():
+    return AuthorStats.objects.filter(
+        follower_count__gte=settings.TIMELINE_CELEBRITY_THRESHOLD
+    )
+
+
+def is_celebrity(author_id):
+    return _celebrities().filter(user_id=author_id).exists()
+
+
+def push_post(post):
+    """Fan a new post out to the timelines of its author's followers.
+
+    Celebrity posts are not pushed, readers pull them instead.
+    """
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id, batch_size=None):
+    """Copy the author's posts into the user's timeline."""
+    batch_size = batch_size or settings.TIMELINE_BATCH_SIZE
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')
+    _insert(
+        (
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts.iterator(chunk_size=batch_size)
+        ),
+        batch_size,
+    )
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def follow(user_id, author_id):
+    if is_celebrity(author_id):
+        # From now on readers pull the author's posts.
+        AuthorStats.objects.filter(user_id=author_id, pulled=False).update(
+            pulled=True
+        )
+    else:
+        backfill(user_id, author_id)
+
+
+def unfollow(user_id, author_id):
+    prune(user_id, author_id)
+    if AuthorStats.objects.filter(
+        user_id=author_id,
+        pulled=True,
+        follower_count__lt=settings.TIMELINE_CELEBRITY_THRESHOLD,
+    ).exists():
+        # Back in push mode, but the remaining followers never received
+        # the posts pulled so far.  Readers keep pulling them until the
+        # backfill is done.
+        transaction.on_commit(lambda: enqueue_push_mode(author_id))
+
+
+def _queued_key(author_id):
+    return f'timeline-push-mode:{author_id}'
+
+
+def enqueue_push_mode(author_id):
+    """Run ``push_mode`` once even if several followers leave meanwhile.
+
+    Until it is done the author stays pulled, which ``rebuild`` also
+    resets if a worker never finishes.
+    """
+    background.submit(
+        'timelines', settings.TIMELINE_WORKERS, push_mode, author_id,
+        queued_key=_queued_key(author_id),
+    )
+
+
+def push_mode(author_id, batch_size=None):
+    """Backfill every follower of an author that is no longer pulled."""
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    for follower_id in followers.iterator():
+        backfill(follower_id, author_id, batch_size)
+    # Gained followers meanwhile? Then the author stays pulled.
+    AuthorStats.objects.filter(
+        user_id=author_id,
+        follower_count__lt=settings.TIMELINE_CELEBRITY_THRESHOLD,
+    ).update(pulled=False)
+    cache.delete(_queued_key(author_id))
+
+
+def rebuild(batch_size=None, stdout=None):
+    """Rebuild every timeline from ``Follow`` and ``Post``."""
+    batch_size = batch_size or settings.TIMELINE_BATCH_SIZE
+    TimelineEntry.objects.all().delete()
+    celebrities = set(_celebrities().values_list('user_id', flat=True))
+    AuthorStats.objects.filter(user_id__in=celebrities).update(pulled=True)
+    AuthorStats.objects.exclude(user_id__in=celebrities).filter(
+        pulled=True
+    ).update(pulled=False)
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    for number, (user_id, author_id) in enumerate(
+        follows.iterator(chunk_size=batch_size), 1
+    ):
+        if author_id not in celebrities:
+            backfill(user_id, author_id, batch_size)
+        if stdout is not None and number % batch_size == 0:
+            stdout.write(f'{number} подписок обработано')
+
+
+def follow_feed(user):
+    return Post.objects.for_feed().filter(author__following__user=user)
+
+
+class TimelinePaginator(CursorPaginator):
+    """Cursor pages of the follow feed built from two streams.
+
+    Posts of regular authors come from the user's materialized timeline,
+    posts of celebrities are pulled at read time.  Both streams are
+    already sorted, so they are merged lazily on ``(pub_date, id)``.
+    ``object_list`` is only used by the legacy ``?page=N`` links.
+    """
+
+    def __init__(self, object_list, per_page, user=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.user = user
+
+    def celebrities(self):
+        return list(
+            AuthorStats.objects.filter(
+                user__following__user=self.user
+            ).filter(
+                Q(pulled=True)
+                | Q(follower_count__gte=settings.TIMELINE_CELEBRITY_THRESHOLD)
+            ).values_list('user_id', flat=True)
+        )
+
+    def fetch(self, boundary, forward, limit):
+        celebrities = self.celebrities()
+        entries = TimelineEntry.objects.filter(
+            user=self.user
+        ).only('pub_date', 'post_id')
+        if celebrities:
+            entries = entries.exclude(post__author_id__in=celebrities)
+        post_ids = [
+            entry.post_id for entry in keyset_slice(
+                entries, ('pub_date', 'post_id'), boundary, forward, limit
+            )
+        ]
+        posts = Post.objects.for_feed().in_bulk(post_ids)
+        pushed = [posts[post_id] for post_id in post_ids if post_id in posts]
+        if not celebrities:
+            return pushed
+        pulled = keyset_slice(
+            Post.objects.for_feed().filter(author_id__in=celebrities),
+            self.key_fields, boundary, forward, limit
+        )
+        merged = heapq.merge(
+            pushed, pulled,
+            key=lambda post: (post.pub_date, post.id),
+            reverse=forward,
+        )
+        return list(islice(merged, limit))
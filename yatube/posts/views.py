@@ -1,47 +1,71 @@
-from django.core.paginator import Paginator
-from django.views.decorators.cache import cache_page
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.urls import reverse
+from core.routers import read_from_replica
 from .models import Post, Group, User, Follow
-from .forms import PostForm, CommentForm
+from . import purging, thumbnails
+from .caching import cache_feed, conditional
+from .comments import comment_page, scope as comment_scope
+from .exports import export_ndjson
+from .forms import PostForm, CommentForm, SearchForm
+from .paginators import paginate
+from .search import SearchPaginator
+from .stats import stats_for
+from .streaming import stream_feed, wants_stream
+from .timelines import TimelinePaginator, follow_feed
 
 NUMBER: int = 10
+COMMENTS_NUMBER: int = 20
 
 
-@cache_page(20, key_prefix='index_page')
+@read_from_replica
+@cache_feed('posts')
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, NUMBER)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    page_obj = paginate(request, post_list, NUMBER)
     context = {
         'page_obj': page_obj,
     }
-    return render(request, 'posts/index.html', context)
+    return purging.tag(
+        request,
+        render(request, 'posts/index.html', context),
+        'posts',
+        *purging.page_keys(page_obj),
+    )
 
 
+@read_from_replica
+@cache_feed('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     template = 'posts/group_list.html'
-    posts = group.posts.all()
-    paginator = Paginator(posts, NUMBER)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.for_feed()
+    if wants_stream(request):
+        return stream_feed(request, template, {'group': group}, posts, 'group')
+    page_obj = paginate(request, posts, NUMBER)
     context = {
         'group': group,
         'page_obj': page_obj,
     }
-    return render(request, template, context)
+    return purging.tag(
+        request,
+        render(request, template, context),
+        purging.group_key(group.slug),
+        *purging.page_keys(page_obj),
+    )
 
 
+@read_from_replica
+@cache_feed('author:{username}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
-    posts_count = posts.count()
-    paginator = Paginator(posts, NUMBER)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.for_feed()
+    author_stats = stats_for(author)
     template = 'posts/profile.html'
     if request.user.is_authenticated:
         following = Follow.objects.filter(
@@ -51,26 +75,89 @@ def profile(request, username):
         following = False
     context = {
         'author': author,
-        'posts_count': posts_count,
-        'page_obj': page_obj,
+        'posts_count': author_stats.post_count,
+        'author_stats': author_stats,
         'following': following,
     }
-    return render(request, template, context)
+    if wants_stream(request):
+        return stream_feed(request, template, context, posts, 'profile')
+    context['page_obj'] = paginate(request, posts, NUMBER)
+    return purging.tag(
+        request,
+        render(request, template, context),
+        purging.author_key(author.pk),
+        *purging.page_keys(context['page_obj']),
+    )
+
+
+def search(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid():
+        filters = {}
+        if form.cleaned_data['group'] is not None:
+            filters['group_id'] = form.cleaned_data['group'].pk
+        if form.cleaned_data['author'] is not None:
+            filters['author_id'] = form.cleaned_data['author'].pk
+        paginator = SearchPaginator(form.cleaned_data['q'], NUMBER, filters)
+        page_obj = paginator.get_cursor_page(request.GET.get('cursor'))
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'page_query': query.urlencode() + '&' if query else '',
+    }
+    return render(request, 'posts/search.html', context)
+
 
+def _post_detail_state(post_id):
+    """What the post page shows depends on, from one indexed query."""
+    row = Post.objects.filter(pk=post_id).values_list(
+        'updated', 'author__username'
+    ).first()
+    if row is None:
+        return None
+    updated, username = row
+    # The author's scope moves with their statistics shown on the page.
+    return [comment_scope(post_id), f'author:{username}'], updated.timestamp()
 
+
+@conditional(_post_detail_state)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
     form_comment = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments, next_cursor = comment_page(
+        post.pk, COMMENTS_NUMBER, request.GET.get('cursor')
+    )
     context = {
         'post': post,
+        'author_stats': stats_for(post.author),
         'form_comment': form_comment,
         'comments': comments,
+        'next_cursor': next_cursor,
     }
     return render(request, template, context)
 
 
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    comments, next_cursor = comment_page(
+        post.pk, COMMENTS_NUMBER, request.GET.get('cursor')
+    )
+    html = render_to_string(
+        'posts/includes/comments.html', {'comments': comments}, request
+    )
+    next_url = None
+    if next_cursor:
+        next_url = (reverse('posts:post_comments', args=[post.pk])
+                    + f'?cursor={next_cursor}')
+    return JsonResponse({'html': html, 'next': next_url})
+
+
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -93,6 +180,8 @@ def post_create(request):
     post_create = form.save(commit=False)
     post_create.author = request.user
     post_create.save()
+    if post_create.image:
+        transaction.on_commit(lambda: thumbnails.enqueue(post_create.pk))
     return redirect('posts:profile', username=request.user)
 
 
@@ -107,19 +196,40 @@ def post_edit(request, post_id):
         context = {'form': form, 'is_edit': True, 'post': post}
         return render(request, 'posts/create_post.html', context)
     form.save()
+    if 'image' in form.changed_data and post.image:
+        transaction.on_commit(lambda: thumbnails.enqueue(post.pk))
     return redirect('posts:post_detail', post_id)
 
 
 @login_required
+@read_from_replica
 def follow_index(request):
-    info_posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(info_posts, NUMBER)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(
+        request,
+        follow_feed(request.user),
+        NUMBER,
+        paginator_class=TimelinePaginator,
+        user=request.user,
+    )
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
 
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user and not request.user.is_staff:
+        return redirect('posts:profile', username=username)
+    response = StreamingHttpResponse(
+        export_ndjson(author, inline_images='inline_images' in request.GET),
+        content_type='application/x-ndjson; charset=utf-8',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{author.username}.ndjson"'
+    )
+    return response
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -51,6 +52,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.instrumentation.InstrumentationMiddleware',
+    'core.middleware.duplicate_queries.DuplicateQueryMiddleware',
+    'core.middleware.replicas.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -90,8 +94,37 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами, настройки ниже применяются
+        # к нему один раз
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_CONN_MAX_AGE', 60)),
     }
 }
+# Применяются к каждому новому соединению с SQLite, см. core/sqlite.py.
+# В WAL читатели не ждут писателей, а busy_timeout ждёт блокировку
+# вместо ошибки «database is locked»
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # Отрицательное значение — размер в КиБ, а не в страницах
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+}
+# Реплики только для чтения, с них читаются ленты. Локально это копия
+# SQLite из YATUBE_REPLICA_DB, её обновляет simulate_replication
+DATABASE_REPLICAS = []
+if os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['YATUBE_REPLICA_DB'],
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append('replica')
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# На сколько секунд реплики могут отставать: столько после записи
+# клиент и свежие ленты читают с основной базы
+REPLICA_MAX_LAG = 5
 
 
 # Password validation
@@ -127,10 +160,34 @@ USE_L10N = True
 USE_TZ = True
 
 
-CACHES = {
-    'default': {
+# Кэш выбирается переменной окружения YATUBE_CACHE. locmem у каждого
+# процесса gunicorn свой, остальные варианты общие для всех воркеров.
+# Для database нужно один раз выполнить manage.py createcachetable,
+# для redis нужен запущенный сервер Redis (адрес в YATUBE_CACHE_LOCATION).
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'filesystem': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
+    },
+    'database': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION', 'yatube_cache'),
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', 'redis://127.0.0.1:6379/1'
+        ),
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'locmem')],
 }
 
 # Static files (CSS, JavaScript, Images)
@@ -150,3 +207,83 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Ленты постов листаются курсорами; номера страниц требуют COUNT(*)
+POSTS_PAGE_NUMBER_LINKS = False
+# Сколько постов отдаётся в потоковом режиме ленты (?stream)
+POSTS_STREAM_PAGE_SIZE = 500
+# Сколько строк читается из курсора базы за раз в потоковом режиме
+POSTS_STREAM_CHUNK_SIZE = 100
+# Сколько строк читается за раз при выгрузке постов автора
+EXPORT_CHUNK_SIZE = 500
+# Сколько строк записывается за один INSERT при импорте контента
+IMPORT_BATCH_SIZE = 5000
+# 'fts5' или 'index'; None - FTS5, если SQLite собран с ним
+POSTS_SEARCH_BACKEND = None
+# Сколько строк ленты подписок записывается за один INSERT
+TIMELINE_BATCH_SIZE = 1000
+# Посты авторов с таким числом подписчиков читаются при показе ленты,
+# а не рассылаются по лентам подписчиков
+TIMELINE_CELEBRITY_THRESHOLD = 5000
+# Потоки, в которых ленты подписчиков заполняются постами автора,
+# опустившегося ниже порога; 0 — прямо в запросе
+TIMELINE_WORKERS = 1
+# Карточки постов версионируются по времени изменения, поэтому живут долго
+POST_CARD_CACHE_TTL = 60 * 60 * 24
+# Ленты сбрасываются счётчиками поколений при изменении постов
+FEED_CACHE_TTL = 60 * 60
+# Сколько секунд обратный прокси хранит ленты для гостей; изменения
+# сбрасывают их раньше запросом PURGE с ключами Surrogate-Key
+PROXY_CACHE_MAX_AGE = 60
+PROXY_PURGE_URL = os.environ.get('YATUBE_PURGE_URL')
+PROXY_PURGE_TIMEOUT = 2
+# PURGE отправляется из фонового потока, чтобы медленный прокси не
+# задерживал запросы с изменениями; False — прямо в запросе
+PROXY_PURGE_IN_BACKGROUND = True
+# Загруженные картинки пересжимаются: больший размер стороны, формат
+# и качество. Файлы называются по хешу содержимого
+POST_IMAGE_MAX_SIZE = 1920
+POST_IMAGE_FORMAT = 'JPEG'
+POST_IMAGE_QUALITY = 85
+# Больше точек не раскодируется: так ограничена память на одну загрузку.
+# JPEG считается уже уменьшенным при раскодировании
+POST_IMAGE_MAX_PIXELS = 40_000_000
+# Сколько секунд не удаляются файлы без ссылок: их может ждать загрузка
+MEDIA_GC_GRACE = 60 * 60 * 24
+# Потоки, в которых готовятся миниатюры; 0 — прямо в запросе
+THUMBNAIL_WORKERS = 2
+# Доля запросов, для которых собираются SQL, шаблоны и кеш. Под
+# manage.py test и pytest по умолчанию 0, чтобы замеры не попадали в вывод
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get(
+    'YATUBE_INSTRUMENTATION_SAMPLE_RATE', 0 if TESTING else 0.01
+))
+# Сколько последних измеренных запросов хранится в памяти процесса
+INSTRUMENTATION_BUFFER_SIZE = 1000
+# Сколько самых медленных SQL-запросов запоминается для запроса
+INSTRUMENTATION_SLOW_QUERIES = 3
+# Замеры пишутся в поток ошибок строкой JSON на каждый измеренный запрос
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'requests': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'yatube.requests': {
+            'handlers': ['requests'],
+            'level': os.environ.get('YATUBE_REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+# Искать в запросах повторы одного и того же SQL (N+1); для разработки
+DUPLICATE_QUERY_CHECK = DEBUG
+# Сколько раз один запрос может выполниться за один HTTP-запрос
+DUPLICATE_QUERY_THRESHOLD = 3